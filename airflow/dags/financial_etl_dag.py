@@ -7,6 +7,8 @@ from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.utils.dates import days_ago
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 
 # Import pipeline components
@@ -17,10 +19,15 @@ from pathlib import Path
 dag_dir = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(dag_dir / 'src'))
 
+import posixpath
+import pyarrow as pa
+import pyarrow.feather as feather
+from pyarrow import fs
+
 from extract import DataExtractor
 from transform import DataTransformer, DataQualityChecker
 from load import DataLoader
-from config import DB_CONFIG, RAW_DATA_DIR
+from config import DB_CONFIG, RAW_DATA_DIR, STAGING_URI
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +55,39 @@ dag = DAG(
 )
 
 
+def _frame_uri(context, name: str) -> str:
+    """Location of the Arrow IPC file handed between tasks of a run"""
+    return f"{STAGING_URI.rstrip('/')}/{context['run_id']}/{name}.arrow"
+
+
+def _delete_run_frames(context):
+    """Delete the run's staged files once they are loaded"""
+    filesystem, path = fs.FileSystem.from_uri(f"{STAGING_URI.rstrip('/')}/{context['run_id']}")
+    filesystem.delete_dir(path)
+
+
+def _write_frame(df, uri: str) -> str:
+    """Write a DataFrame or Arrow table as Feather v2 (Arrow IPC) to a local path or object store URI"""
+    table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+    filesystem, path = fs.FileSystem.from_uri(uri)
+    filesystem.create_dir(posixpath.dirname(path), recursive=True)
+    with filesystem.open_output_stream(path) as sink:
+        feather.write_feather(table, sink, compression='lz4')
+    return uri
+
+
+def _read_table(uri: str, columns=None) -> pa.Table:
+    """Read a Feather v2 file written by an upstream task"""
+    filesystem, path = fs.FileSystem.from_uri(uri)
+    with filesystem.open_input_file(path) as source:
+        return feather.read_table(source, columns=columns)
+
+
+def _read_frame(uri: str):
+    """Read a Feather v2 file written by an upstream task back into pandas"""
+    return _read_table(uri).to_pandas(split_blocks=True, self_destruct=True)
+
+
 def extract_data(**context):
     """Extract data from sources"""
     logger.info("Starting data extraction...")
@@ -55,19 +95,25 @@ def extract_data(**context):
     try:
         extractor = DataExtractor(RAW_DATA_DIR)
         
-        # Extract customers
-        customers_df = extractor.extract_customers(num_records=5000)
-        logger.info(f"Extracted {len(customers_df)} customers")
+        # Extract customers and transactions concurrently; they write different
+        # files and the NumPy/Parquet work releases the GIL
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            customers_future = executor.submit(extractor.extract_customers, num_records=5000)
+            transactions_future = executor.submit(extractor.extract_transactions, num_records=10000)
+            customers_df = customers_future.result()
+            transactions_df = transactions_future.result()
         
-        # Extract transactions
-        transactions_df = extractor.extract_transactions(num_records=10000)
+        logger.info(f"Extracted {len(customers_df)} customers")
         logger.info(f"Extracted {len(transactions_df)} transactions")
         
-        # Push to XCom for next task
+        # Hand off via Arrow IPC files; XCom only carries the paths
+        customers_path = _write_frame(customers_df, _frame_uri(context, 'customers'))
+        transactions_path = _write_frame(transactions_df, _frame_uri(context, 'transactions'))
+        
         context['task_instance'].xcom_push(key='customers_count', value=len(customers_df))
         context['task_instance'].xcom_push(key='transactions_count', value=len(transactions_df))
-        context['task_instance'].xcom_push(key='customers_data', value=customers_df.to_json())
-        context['task_instance'].xcom_push(key='transactions_data', value=transactions_df.to_json())
+        context['task_instance'].xcom_push(key='customers_path', value=customers_path)
+        context['task_instance'].xcom_push(key='transactions_path', value=transactions_path)
         
         logger.info("✓ Extraction completed successfully")
         return True
@@ -82,28 +128,29 @@ def transform_data(**context):
     logger.info("Starting data transformation...")
     
     try:
-        # Pull data from XCom
-        import pandas as pd
-        transactions_json = context['task_instance'].xcom_pull(
+        # Pull file paths from XCom
+        transactions_path = context['task_instance'].xcom_pull(
             task_ids='extract_data',
-            key='transactions_data'
+            key='transactions_path'
         )
-        customers_json = context['task_instance'].xcom_pull(
+        customers_path = context['task_instance'].xcom_pull(
             task_ids='extract_data',
-            key='customers_data'
+            key='customers_path'
         )
         
-        transactions_df = pd.read_json(transactions_json)
-        customers_df = pd.read_json(customers_json)
+        # Transactions stay an Arrow table from file to file, never going through
+        # pandas; validation only needs the customer_id column of the customers file
+        transactions_table = _read_table(transactions_path)
+        customer_ids = _read_table(customers_path, columns=['customer_id']).to_pandas()
         
         # Transform
         transformer = DataTransformer()
-        clean_transactions = transformer.transform_transactions(transactions_df)
+        clean_transactions = transformer.transform_transactions_arrow(transactions_table)
         
         # Validate against customers
         clean_transactions = transformer.validate_against_customers(
             clean_transactions,
-            customers_df
+            customer_ids
         )
         
         # Quality checks
@@ -116,14 +163,14 @@ def transform_data(**context):
         if not quality_passed:
             logger.warning("Quality checks failed")
         
-        # Push to XCom
+        # Push to XCom (customers are unchanged, so reuse the extract file)
         context['task_instance'].xcom_push(
-            key='clean_transactions',
-            value=clean_transactions.to_json()
+            key='clean_transactions_path',
+            value=_write_frame(clean_transactions, _frame_uri(context, 'clean_transactions'))
         )
         context['task_instance'].xcom_push(
-            key='clean_customers',
-            value=customers_df.to_json()
+            key='clean_customers_path',
+            value=customers_path
         )
         context['task_instance'].xcom_push(
             key='transformed_count',
@@ -147,19 +194,18 @@ def load_data(**context):
     logger.info("Starting data loading...")
     
     try:
-        # Pull data from XCom
-        import pandas as pd
-        clean_transactions_json = context['task_instance'].xcom_pull(
+        # Pull file paths from XCom
+        clean_transactions_path = context['task_instance'].xcom_pull(
             task_ids='transform_data',
-            key='clean_transactions'
+            key='clean_transactions_path'
         )
-        clean_customers_json = context['task_instance'].xcom_pull(
+        clean_customers_path = context['task_instance'].xcom_pull(
             task_ids='transform_data',
-            key='clean_customers'
+            key='clean_customers_path'
         )
         
-        clean_transactions = pd.read_json(clean_transactions_json)
-        clean_customers = pd.read_json(clean_customers_json)
+        clean_transactions = _read_frame(clean_transactions_path)
+        clean_customers = _read_frame(clean_customers_path)
         
         # Load to database
         loader = DataLoader(DB_CONFIG)
@@ -167,9 +213,12 @@ def load_data(**context):
         # Start audit log
         run_id = loader.start_audit_log('airflow_etl_pipeline')
         
-        # Load data
-        customers_loaded = loader.load_customers(clean_customers)
-        transactions_loaded = loader.load_transactions(clean_transactions)
+        # Load both tables concurrently
+        loaded = asyncio.run(loader.aload_many({
+            'dim_customers': clean_customers,
+            'fact_transactions': clean_transactions
+        }))
+        transactions_loaded = loaded['fact_transactions']
         
         # Get metrics
         extracted_count = context['task_instance'].xcom_pull(
@@ -197,6 +246,9 @@ def load_data(**context):
         
         loader.close()
         
+        # Failed runs keep their files so retries can reload them
+        _delete_run_frames(context)
+        
         logger.info(f"✓ Loading completed: {transactions_loaded} transactions loaded")
         return True
         
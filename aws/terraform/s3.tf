@@ -48,6 +48,24 @@ resource "aws_s3_bucket_lifecycle_configuration" "raw_data_lifecycle" {
       storage_class = "STANDARD_IA"
     }
   }
+
+  # Partial Lambda output left by a timed-out invocation
+  rule {
+    id     = "expire-lambda-staging"
+    status = "Enabled"
+
+    filter {
+      prefix = "staging/"
+    }
+
+    expiration {
+      days = 1
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
 }
 
 # S3 notification for Lambda trigger
@@ -5,6 +5,7 @@
 -- ================================================================
 
 -- Drop tables if they exist (for clean setup)
+DROP TABLE IF EXISTS stg_fact_transactions;
 DROP TABLE IF EXISTS fact_transactions CASCADE;
 DROP TABLE IF EXISTS dim_customers CASCADE;
 DROP TABLE IF EXISTS etl_audit_log CASCADE;
@@ -73,6 +74,19 @@ CREATE INDEX idx_transactions_category ON fact_transactions(category);
 CREATE INDEX idx_transactions_customer_date ON fact_transactions(customer_id, transaction_date DESC);
 CREATE INDEX idx_transactions_date_status ON fact_transactions(transaction_date DESC, status);
 
+-- ================================================================
+-- STAGING TABLE: Transactions (bulk load target)
+-- ================================================================
+-- UNLOGGED (no WAL) and without indexes or constraints: COPY lands here, then a
+-- single INSERT ... SELECT moves the rows into fact_transactions. amount and
+-- risk_score are staged as float8 (binary COPY of plain floats, no per-row
+-- Decimal objects) and cast to NUMERIC by that INSERT. Concurrent loads
+-- (DataLoader.aload_many) stage into their own copy of this table
+CREATE UNLOGGED TABLE stg_fact_transactions (LIKE fact_transactions INCLUDING DEFAULTS);
+ALTER TABLE stg_fact_transactions
+    ALTER COLUMN amount TYPE DOUBLE PRECISION,
+    ALTER COLUMN risk_score TYPE DOUBLE PRECISION;
+
 -- ================================================================
 -- AUDIT TABLE: ETL Execution Log
 -- ================================================================
@@ -16,13 +16,29 @@ PROCESSED_DATA_DIR = DATA_DIR / "processed"
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Where Airflow tasks stage intermediate Arrow files (local path or s3:// URI)
+STAGING_URI = os.getenv('ETL_STAGING_URI', str(PROCESSED_DATA_DIR / 'airflow'))
+
+# Load transactions server-side from a Parquet file in PROCESSED_DATA_DIR; needs the
+# pg_parquet extension and a directory the database server can read at the same path
+PARQUET_LOAD = os.getenv('ETL_PARQUET_LOAD', 'false').lower() == 'true'
+
+# Transactions per pipeline extract/transform/load chunk; bounds peak memory. Chunks of
+# at least transform.PARALLEL_MIN_ROWS rows are transformed across worker processes
+CHUNK_ROWS = int(os.getenv('ETL_CHUNK_ROWS', '100000'))
+
+# Engine for the transaction transform: 'pandas' or 'polars' (one lazy query)
+TRANSFORM_ENGINE = os.getenv('ETL_TRANSFORM_ENGINE', 'pandas')
+
 # Database configuration
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
     'port': os.getenv('DB_PORT', '5432'),
     'database': os.getenv('DB_NAME', 'etl_db'),
     'user': os.getenv('DB_USER', 'etl_user'),
-    'password': os.getenv('DB_PASSWORD', 'etl_password')
+    'password': os.getenv('DB_PASSWORD', 'etl_password'),
+    # SQLAlchemy driver; COPY needs psycopg (3), others load with chunked INSERTs
+    'driver': os.getenv('DB_DRIVER', 'psycopg')
 }
 
 # Data source configuration
@@ -5,13 +5,40 @@ Extracts data from various sources (JSON API, CSV, databases)
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
 from pathlib import Path
+from typing import Iterator, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Value domains and sampling weights for the synthetic low-cardinality columns
+CATEGORIES = ['groceries', 'restaurants', 'gas', 'retail', 'utilities', 'entertainment']
+CATEGORY_WEIGHTS = [0.25, 0.20, 0.15, 0.20, 0.10, 0.10]
+STATUSES = ['completed', 'pending', 'failed']
+STATUS_WEIGHTS = [0.90, 0.07, 0.03]
+PAYMENT_METHODS = ['credit_card', 'debit_card', 'bank_transfer', 'cash']
+PAYMENT_METHOD_WEIGHTS = [0.50, 0.30, 0.15, 0.05]
+CUSTOMER_TIERS = ['bronze', 'silver', 'gold', 'platinum']
+CUSTOMER_TIER_WEIGHTS = [0.50, 0.30, 0.15, 0.05]
+
+
+def _format_ids(prefix: str, numbers: np.ndarray, width: int) -> np.ndarray:
+    """Build zero-padded string IDs (e.g. CUST000042) in one vectorized pass"""
+    # zfill can't size its output from an empty array on numpy 2
+    if numbers.size == 0:
+        return np.array([], dtype=str)
+    return np.char.add(prefix, np.char.zfill(numbers.astype(str), width))
+
+
+def _sample_categorical(rng: np.random.Generator, categories: list, weights: list, size: int) -> pd.Categorical:
+    """Sample int8 codes and wrap them as a Categorical without materializing strings"""
+    codes = rng.choice(np.arange(len(categories), dtype=np.int8), size, p=weights)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
 
 class DataExtractor:
     """
@@ -19,9 +46,15 @@ class DataExtractor:
     Demonstrates: Multi-source data extraction, JSON handling, error handling
     """
     
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, seed: int = 42):
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Seeded once per extractor; each dataset gets its own independent stream
+        # so concurrent extract calls never share generator state
+        transactions_seed, customers_seed = np.random.SeedSequence(seed).spawn(2)
+        self.transactions_rng = np.random.default_rng(transactions_seed)
+        self.customers_rng = np.random.default_rng(customers_seed)
     
     def extract_transactions(self, num_records: int = 10000) -> pd.DataFrame:
         """
@@ -36,54 +69,111 @@ class DataExtractor:
         """
         logger.info(f"Extracting {num_records} transactions...")
         
-        np.random.seed(42)
+        df = self._generate_transactions(num_records)
+        
+        # Save raw data
+        output_file = self.output_dir / f'raw_transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.parquet'
+        df.to_parquet(output_file, compression='snappy', index=False, use_dictionary=True)
+        logger.info(f"Raw data saved to {output_file}")
+        
+        logger.info(f"Extracted {len(df)} transactions")
+        return df
+    
+    def iter_transactions(self, num_records: int = 10000, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Extract transaction data as a stream of chunks.
+        
+        Chunks are near-equal in size (none is a small remainder) and each is
+        appended to a single raw Parquet file before it is yielded, so only
+        one chunk is held in memory at a time.
+        
+        Args:
+            num_records: Total number of transactions to generate
+            chunk_size: Maximum rows per chunk
+            
+        Yields:
+            DataFrames with transaction data; IDs continue across chunks
+        """
+        logger.info(f"Extracting {num_records} transactions in chunks of up to {chunk_size}...")
+        
+        # All chunks date their transactions back from the same instant
+        extracted_at = datetime.now()
+        num_chunks = max(1, -(-num_records // chunk_size))
+        output_file = self.output_dir / f'raw_transactions_{extracted_at.strftime("%Y%m%d_%H%M%S")}.parquet'
+        writer = None
+        start = 0
+        
+        try:
+            for size in np.diff(np.linspace(0, num_records, num_chunks + 1, dtype=np.int64)).tolist():
+                df = self._generate_transactions(size, first_id=start, as_of=extracted_at)
+                start += size
+                
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema, compression='snappy', use_dictionary=True)
+                writer.write_table(table.cast(writer.schema))
+                
+                yield df
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        logger.info(f"Raw data saved to {output_file}")
+        logger.info(f"Extracted {start} transactions")
+    
+    def _generate_transactions(
+        self,
+        num_records: int,
+        first_id: int = 0,
+        as_of: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Generate one batch of synthetic transactions.
+        
+        Args:
+            num_records: Number of transactions to generate
+            first_id: Number of the first transaction ID in the batch
+            as_of: Time transaction dates are counted back from (defaults to now)
+            
+        Returns:
+            DataFrame with transaction data
+        """
+        rng = self.transactions_rng
         
         # Generate synthetic transaction data
+        # transaction_id starts as int32 codes, one per generated ID
         data = {
-            'transaction_id': [f'TXN{i:08d}' for i in range(num_records)],
-            'customer_id': [f'CUST{np.random.randint(1, 5000):06d}' for _ in range(num_records)],
-            'transaction_date': [
-                datetime.now() - timedelta(days=int(np.random.randint(0, 365)))
-                for _ in range(num_records)
-            ],
-            'amount': np.random.lognormal(mean=4, sigma=1.5, size=num_records).round(2),
-            'merchant_id': [f'MERCH{np.random.randint(1, 500):04d}' for _ in range(num_records)],
-            'category': np.random.choice(
-                ['groceries', 'restaurants', 'gas', 'retail', 'utilities', 'entertainment'],
-                num_records,
-                p=[0.25, 0.20, 0.15, 0.20, 0.10, 0.10]
-            ),
-            'status': np.random.choice(
-                ['completed', 'pending', 'failed'],
-                num_records,
-                p=[0.90, 0.07, 0.03]
-            ),
-            'payment_method': np.random.choice(
-                ['credit_card', 'debit_card', 'bank_transfer', 'cash'],
-                num_records,
-                p=[0.50, 0.30, 0.15, 0.05]
-            )
+            'transaction_id': np.arange(num_records, dtype=np.int32),
+            'customer_id': _format_ids('CUST', rng.integers(1, 5000, size=num_records), 6),
+            'transaction_date': np.datetime64(as_of or datetime.now()) - rng.integers(
+                0, 365, size=num_records, dtype=np.int32
+            ).astype('timedelta64[D]'),
+            'amount': rng.lognormal(mean=4, sigma=1.5, size=num_records).round(2),
+            'merchant_id': _format_ids('MERCH', rng.integers(1, 500, size=num_records), 4),
+            'category': _sample_categorical(rng, CATEGORIES, CATEGORY_WEIGHTS, num_records),
+            'status': _sample_categorical(rng, STATUSES, STATUS_WEIGHTS, num_records),
+            'payment_method': _sample_categorical(rng, PAYMENT_METHODS, PAYMENT_METHOD_WEIGHTS, num_records)
         }
         
-        df = pd.DataFrame(data)
-        
         # Introduce some data quality issues (realistic scenario)
+        # Written into the raw arrays before the DataFrame exists, so no column copies
         # 2% null values in amount
-        null_indices = np.random.choice(df.index, size=int(num_records * 0.02), replace=False)
-        df.loc[null_indices, 'amount'] = np.nan
+        null_indices = rng.choice(num_records, size=int(num_records * 0.02), replace=False)
+        data['amount'][null_indices] = np.nan
         
         # 1% duplicate transaction IDs (only if we have enough records)
         if num_records > 100:
-            dup_indices = np.random.choice(df.index[100:], size=int(num_records * 0.01), replace=False)
-            df.loc[dup_indices, 'transaction_id'] = df.loc[dup_indices - 100, 'transaction_id'].values
+            # Positions are drawn directly as offsets, so no index array is materialized
+            dup_indices = 100 + rng.choice(num_records - 100, size=int(num_records * 0.01), replace=False)
+            data['transaction_id'][dup_indices] = data['transaction_id'][dup_indices - 100]
         
-        # Save raw data
-        output_file = self.output_dir / f'raw_transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        df.to_csv(output_file, index=False)
-        logger.info(f"Raw data saved to {output_file}")
+        # Categorical over the codes, so deduplication downstream hashes ints, not strings
+        data['transaction_id'] = pd.Categorical.from_codes(
+            data['transaction_id'],
+            categories=_format_ids('TXN', np.arange(first_id, first_id + num_records), 8)
+        )
         
-        logger.info(f"Extracted {len(df)} transactions")
-        return df
+        return pd.DataFrame(data)
     
     def extract_customers(self, num_records: int = 5000) -> pd.DataFrame:
         """
@@ -97,28 +187,23 @@ class DataExtractor:
         """
         logger.info(f"Extracting {num_records} customers...")
         
-        np.random.seed(42)
+        rng = self.customers_rng
         
         data = {
             'customer_id': [f'CUST{i:06d}' for i in range(1, num_records + 1)],
             'customer_name': [f'Customer {i}' for i in range(1, num_records + 1)],
-            'registration_date': [
-                datetime.now() - timedelta(days=int(np.random.randint(0, 1825)))
-                for _ in range(num_records)
-            ],
-            'customer_tier': np.random.choice(
-                ['bronze', 'silver', 'gold', 'platinum'],
-                num_records,
-                p=[0.50, 0.30, 0.15, 0.05]
-            ),
+            'registration_date': np.datetime64(datetime.now()) - rng.integers(
+                0, 1825, size=num_records, dtype=np.int32
+            ).astype('timedelta64[D]'),
+            'customer_tier': _sample_categorical(rng, CUSTOMER_TIERS, CUSTOMER_TIER_WEIGHTS, num_records),
             'email': [f'customer{i}@example.com' for i in range(1, num_records + 1)],
-            'is_active': np.random.choice([True, False], num_records, p=[0.95, 0.05])
+            'is_active': rng.choice([True, False], num_records, p=[0.95, 0.05])
         }
         
         df = pd.DataFrame(data)
         
-        output_file = self.output_dir / f'raw_customers_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        df.to_csv(output_file, index=False)
+        output_file = self.output_dir / f'raw_customers_{datetime.now().strftime("%Y%m%d_%H%M%S")}.parquet'
+        df.to_parquet(output_file, compression='snappy', index=False, use_dictionary=True)
         logger.info(f"Customer data saved to {output_file}")
         
         logger.info(f"Extracted {len(df)} customers")
@@ -3,15 +3,251 @@ Data Loading Module
 Loads transformed data into PostgreSQL database
 """
 
+import asyncio
 import pandas as pd
-from sqlalchemy import create_engine, text
-from typing import Dict, List, Optional
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import islice
+from psycopg import AsyncConnection, sql
+from psycopg.conninfo import make_conninfo
+from sqlalchemy import URL, TextClause, column, create_engine, table as sql_table, text
+from sqlalchemy.engine import Connection
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 import logging
+import threading
+import uuid
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connections kept open for concurrent pipeline stages, plus burst headroom
+POOL_SIZE = 4
+MAX_OVERFLOW = 8
+
+# Rows per executemany batch when loading without COPY
+INSERT_CHUNK_SIZE = 10000
+
+# Session settings for loader connections: JIT only adds planning cost to bulk
+# INSERT/COPY statements, and loads don't wait on WAL flushes at commit
+SESSION_OPTIONS = '-c jit=off -c synchronous_commit=off'
+
+# Loads larger than this drop fact_transactions' secondary indexes and rebuild them after
+BULK_MODE_MIN_ROWS = 50000
+
+# Secondary (non-constraint) indexes on a table, with their definitions
+SECONDARY_INDEXES = text("""
+    SELECT i.relname, pg_get_indexdef(x.indexrelid)
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    WHERE x.indrelid = CAST(:table AS regclass)
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+""")
+
+# Target columns and their PostgreSQL types for binary COPY (see sql/create_tables.sql).
+# Transactions COPY into stg_fact_transactions, which keeps amount and risk_score
+# as float8; the merge into fact_transactions casts them to NUMERIC server-side
+CUSTOMER_COLUMNS = {
+    'customer_id': 'varchar',
+    'customer_name': 'varchar',
+    'registration_date': 'timestamp',
+    'customer_tier': 'varchar',
+    'email': 'varchar',
+    'is_active': 'bool',
+}
+
+TRANSACTION_COLUMNS = {
+    'transaction_id': 'varchar',
+    'customer_id': 'varchar',
+    'transaction_date': 'timestamp',
+    'amount': 'float8',
+    'merchant_id': 'varchar',
+    'category': 'varchar',
+    'status': 'varchar',
+    'payment_method': 'varchar',
+    'transaction_year': 'int4',
+    'transaction_month': 'int4',
+    'transaction_day': 'int4',
+    'transaction_dayofweek': 'int4',
+    'transaction_hour': 'int4',
+    'amount_category': 'varchar',
+    'risk_score': 'float8',
+    'risk_level': 'varchar',
+    'processed_at': 'timestamp',
+}
+
+# Target columns per table, for loaders that take frames keyed by table name
+TABLE_COLUMNS = {
+    'dim_customers': CUSTOMER_COLUMNS,
+    'fact_transactions': TRANSACTION_COLUMNS,
+}
+
+# Arrow types for the PostgreSQL column types above, used for Parquet staging files
+PARQUET_TYPES = {
+    'varchar': pa.string(),
+    'timestamp': pa.timestamp('us'),
+    'float8': pa.float64(),
+    'int4': pa.int32(),
+    'bool': pa.bool_(),
+}
+
+# Column dtypes coerced before loading transactions
+TRANSACTION_CONVERSIONS = {
+    'amount': 'float64',
+    'amount_category': 'string',
+    'risk_score': 'float64',
+    'risk_level': 'string',
+}
+
+# Transaction columns parsed as datetimes unless they already are
+TRANSACTION_DATETIME_COLUMNS = ['transaction_date', 'processed_at']
+
+# Staged transactions are moved into fact_transactions in one set-based statement
+MERGE_STAGED_TRANSACTIONS = "INSERT INTO fact_transactions SELECT * FROM stg_fact_transactions"
+TRUNCATE_STAGED_TRANSACTIONS = "TRUNCATE stg_fact_transactions"
+
+# Concurrent loads (aload_many) each stage into their own copy of the stage
+# table, so overlapping runs can't merge or clear each other's rows
+LOAD_STAGE_PREFIX = 'stg_fact_transactions_'
+CREATE_LOAD_STAGE = "CREATE UNLOGGED TABLE {} (LIKE stg_fact_transactions INCLUDING DEFAULTS)"
+MERGE_LOAD_STAGE = "INSERT INTO fact_transactions SELECT * FROM {}"
+DROP_LOAD_STAGE = "DROP TABLE IF EXISTS {}"
+
+# Audit statements are built once, so SQLAlchemy's compiled cache keys on the same
+# objects every run and psycopg can prepare them server-side on reuse
+INSERT_AUDIT_LOG = text("""
+    INSERT INTO etl_audit_log 
+    (pipeline_name, start_time, status)
+    VALUES (:pipeline_name, :start_time, :status)
+    RETURNING run_id
+""")
+
+UPDATE_AUDIT_LOG = text("""
+    UPDATE etl_audit_log 
+    SET end_time = :end_time,
+        status = :status,
+        records_extracted = :records_extracted,
+        records_transformed = :records_transformed,
+        records_loaded = :records_loaded,
+        records_rejected = :records_rejected,
+        error_message = :error_message,
+        quality_report = :quality_report
+    WHERE run_id = :run_id
+""")
+
+# Column types of the audit fields set by update_audit_log (see sql/create_tables.sql)
+AUDIT_UPDATE_COLUMNS = {
+    'run_id': 'integer',
+    'end_time': 'timestamp',
+    'status': 'varchar',
+    'records_extracted': 'integer',
+    'records_transformed': 'integer',
+    'records_loaded': 'integer',
+    'records_rejected': 'integer',
+    'error_message': 'text',
+    'quality_report': 'jsonb',
+}
+
+
+@lru_cache(maxsize=8)
+def _read_sql(path: str) -> Tuple[str, ...]:
+    """Read a SQL script once and split it into its non-empty statements"""
+    with open(path, 'r') as f:
+        return tuple(q for q in f.read().split(';') if q.strip())
+
+
+def _prepare_transactions(transactions_df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce transaction columns to the types the loaders expect"""
+    # Only converted columns are rebuilt, the rest are shared with
+    # transactions_df rather than copied
+    columns = {col: transactions_df[col] for col in transactions_df.columns}
+    
+    # Coerce categorical and float columns in a single astype call
+    conversions = {
+        col: dtype for col, dtype in TRANSACTION_CONVERSIONS.items()
+        if col in columns
+    }
+    columns.update(transactions_df[list(conversions)].astype(conversions).items())
+    
+    # Parse datetime columns only if they aren't datetime64 already (e.g. read from CSV)
+    for col in TRANSACTION_DATETIME_COLUMNS:
+        if col in columns and not pd.api.types.is_datetime64_any_dtype(columns[col]):
+            columns[col] = pd.to_datetime(columns[col], format='ISO8601', cache=True)
+    
+    return pd.DataFrame(columns, copy=False)
+
+
+def _audit_update_statement(pending: List[Dict]) -> Tuple[TextClause, Dict]:
+    """
+    One UPDATE ... FROM (VALUES ...) applying several audit updates.
+    
+    Args:
+        pending: update_audit_log parameter dicts, one per run
+        
+    Returns:
+        Statement and its bind parameters, numbered per VALUES row
+    """
+    fields = list(AUDIT_UPDATE_COLUMNS)
+    values = ', '.join(
+        '(' + ', '.join(f':{field}_{i}' for field in fields) + ')'
+        for i in range(len(pending))
+    )
+    params = {f'{field}_{i}': update[field] for i, update in enumerate(pending) for field in fields}
+    assignments = ', '.join(
+        f'{field} = CAST(v.{field} AS {type_})'
+        for field, type_ in AUDIT_UPDATE_COLUMNS.items() if field != 'run_id'
+    )
+    statement = text(f"""
+        UPDATE etl_audit_log
+        SET {assignments}
+        FROM (VALUES {values}) AS v({', '.join(fields)})
+        WHERE etl_audit_log.run_id = CAST(v.run_id AS integer)
+    """)
+    return statement, params
+
+
+def _merge_staged_transactions(conn: Connection) -> int:
+    """Move staged rows into fact_transactions and empty the stage; returns rows moved"""
+    moved = conn.execute(text(MERGE_STAGED_TRANSACTIONS)).rowcount
+    conn.execute(text(TRUNCATE_STAGED_TRANSACTIONS))
+    return moved
+
+
+def _to_objects(values: pd.Series) -> np.ndarray:
+    """Column as an object array with missing values replaced by None (SQL NULL)"""
+    return np.where(values.isna().to_numpy(), None, values.to_numpy(dtype=object))
+
+
+def _column_arrays(
+    df: pd.DataFrame,
+    columns: Dict[str, str]
+) -> Tuple[Dict[str, str], List[np.ndarray]]:
+    """
+    Select the target columns present in df, as one array per column.
+    
+    Missing values (NaN/NaT/None) become None so they load as SQL NULL.
+    """
+    columns = {c: t for c, t in columns.items() if c in df.columns}
+    return columns, [_to_objects(df[c]) for c in columns]
+
+
+def _parquet_copy_sql(path, columns: List[str]) -> sql.Composed:
+    """Server-side COPY of a Parquet file into the transaction stage, with the path as a quoted literal"""
+    return sql.SQL("COPY stg_fact_transactions ({}) FROM {} WITH (format 'parquet')").format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.Literal(str(path))
+    )
+
+
+def _copy_sql(table: str, columns: Dict[str, str]) -> str:
+    """Binary COPY FROM STDIN statement for the given columns"""
+    return f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)"
+
 
 class DataLoader:
     """
@@ -25,161 +261,468 @@ class DataLoader:
         
         Args:
             db_config: Dictionary with database connection parameters
-                      {host, port, database, user, password}
+                      {host, port, database, user, password}, plus an optional
+                      SQLAlchemy driver name (default 'psycopg'; async loads
+                      always use psycopg)
         """
         self.db_config = db_config
         self.engine = None
         self.run_id = None
+        # Audit updates deferred with update_audit_log(..., deferred=True); applied
+        # in a single UPDATE ... FROM (VALUES ...) by flush_audit()
+        self._audit_queue: List[Dict] = []
+        self._audit_lock = threading.Lock()
         self._connect()
     
     def _connect(self):
         """Create database connection"""
         try:
-            connection_string = (
-                f"postgresql://{self.db_config['user']}:{self.db_config['password']}"
-                f"@{self.db_config['host']}:{self.db_config['port']}"
-                f"/{self.db_config['database']}"
+            # psycopg 3 by default (binary COPY); URL.create escapes credentials
+            connection_string = URL.create(
+                f"postgresql+{self.db_config.get('driver', 'psycopg')}",
+                username=self.db_config['user'],
+                password=self.db_config['password'],
+                host=self.db_config['host'],
+                port=int(self.db_config['port']),
+                database=self.db_config['database']
+            )
+            self.engine = create_engine(
+                connection_string,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                insertmanyvalues_page_size=INSERT_CHUNK_SIZE,
+                connect_args={'options': SESSION_OPTIONS}
             )
-            self.engine = create_engine(connection_string)
             logger.info("Database connection established")
         except Exception as e:
-            logger.error(f"Failed to connect to database: {str(e)}")
+            logger.error("Failed to connect to database: %s", e)
             raise
     
-    def create_schema(self, sql_file_path: str):
+    def create_schema(self, sql_file_path: str, conn: Optional[Connection] = None):
         """
         Execute SQL schema creation script.
         
         Args:
             sql_file_path: Path to SQL file with CREATE TABLE statements
+            conn: Open connection to reuse (committed by the caller)
         """
-        logger.info(f"Creating database schema from {sql_file_path}")
+        logger.info("Creating database schema from %s", sql_file_path)
         
         try:
-            with open(sql_file_path, 'r') as f:
-                sql_script = f.read()
-            
-            with self.engine.connect() as conn:
-                # Execute the entire script
-                conn.execute(text(sql_script))
-                conn.commit()
+            with self._transaction(conn) as conn:
+                # Execute the script statement by statement
+                for statement in _read_sql(sql_file_path):
+                    conn.execute(text(statement))
             
             logger.info("Database schema created successfully")
         except Exception as e:
-            logger.error(f"Failed to create schema: {str(e)}")
+            logger.error("Failed to create schema: %s", e)
             raise
     
-    def load_customers(self, customers_df: pd.DataFrame) -> int:
+    def connect(self) -> Connection:
+        """
+        Open an autocommit connection to reuse across audit and bookkeeping calls.
+        
+        Returns:
+            Connection to pass as conn=; each statement commits on its own
+        """
+        return self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    
+    @contextmanager
+    def bulk_transaction(self):
+        """
+        Open a transaction for bulk loading with synchronous_commit off.
+        
+        Yields:
+            Connection to pass as conn= to the load methods; commits on exit
+        """
+        with self.engine.begin() as conn:
+            conn.execute(text("SET LOCAL synchronous_commit = OFF"))
+            yield conn
+    
+    @contextmanager
+    def bulk_mode(self, num_rows: int, table: str = 'fact_transactions'):
+        """
+        Drop a table's secondary indexes for a large load and rebuild them afterwards.
+        
+        Args:
+            num_rows: Expected number of rows; below BULK_MODE_MIN_ROWS this is a no-op
+            table: Table whose secondary indexes are dropped
+        """
+        if num_rows <= BULK_MODE_MIN_ROWS:
+            yield
+            return
+        
+        with self.engine.begin() as conn:
+            indexes = conn.execute(SECONDARY_INDEXES, {'table': table}).fetchall()
+            for name, _ in indexes:
+                conn.execute(text(f"DROP INDEX {conn.dialect.identifier_preparer.quote(name)}"))
+        logger.info("Dropped %d indexes on %s for bulk load", len(indexes), table)
+        
+        try:
+            yield
+        finally:
+            # Rebuild in parallel, one connection per index
+            def rebuild(definition):
+                with self.engine.begin() as conn:
+                    conn.execute(text(definition))
+            
+            with ThreadPoolExecutor(max_workers=POOL_SIZE) as executor:
+                list(executor.map(rebuild, [definition for _, definition in indexes]))
+            logger.info("Rebuilt %d indexes on %s", len(indexes), table)
+    
+    def _transaction(self, conn: Optional[Connection] = None):
+        """Reuse the caller's connection, or open a transaction of our own"""
+        return nullcontext(conn) if conn is not None else self.engine.begin()
+    
+    def _copy_rows(
+        self,
+        table: str,
+        columns: Dict[str, str],
+        rows: Iterable[tuple],
+        conn: Optional[Connection] = None
+    ) -> int:
+        """
+        Stream rows into a table with COPY FROM STDIN in binary format.
+        
+        Args:
+            table: Target table name
+            columns: Ordered mapping of column name to PostgreSQL type
+            rows: Iterable of tuples matching the column order
+            conn: Open connection to load within (committed by the caller);
+                  defaults to a dedicated connection committed here
+            
+        Returns:
+            Number of rows copied, as reported by the server
+        """
+        raw_conn = conn.connection if conn is not None else self.engine.raw_connection()
+        
+        try:
+            with raw_conn.cursor() as cur:
+                with cur.copy(_copy_sql(table, columns)) as copy:
+                    copy.set_types(list(columns.values()))
+                    for row in rows:
+                        copy.write_row(row)
+                rowcount = cur.rowcount
+            if conn is None:
+                raw_conn.commit()
+            return rowcount
+        finally:
+            if conn is None:
+                raw_conn.close()
+    
+    def _copy_df(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        columns: Dict[str, str],
+        conn: Optional[Connection] = None
+    ) -> int:
+        """
+        Bulk load a DataFrame into a table with COPY FROM STDIN
+        (or chunked INSERTs when the driver has no COPY support).
+        
+        Args:
+            df: DataFrame to load
+            table: Target table name
+            columns: Ordered mapping of column name to PostgreSQL type;
+                     columns missing from df are skipped
+            conn: Open connection to load within (see _copy_rows)
+            
+        Returns:
+            Number of rows loaded, as reported by the server
+        """
+        # One array per column (no intermediate frame)
+        columns, arrays = _column_arrays(df, columns)
+        
+        # COPY needs psycopg 3; other drivers fall back to chunked INSERTs
+        if self.engine.dialect.driver == 'psycopg':
+            return self._copy_rows(table, columns, zip(*arrays), conn=conn)
+        return self._insert_rows(table, columns, zip(*arrays), conn=conn)
+    
+    def _insert_rows(
+        self,
+        table: str,
+        columns: Dict[str, str],
+        rows: Iterable[tuple],
+        conn: Optional[Connection] = None,
+        chunksize: int = INSERT_CHUNK_SIZE
+    ) -> int:
+        """
+        Insert rows with executemany in fixed-size chunks (fallback for COPY).
+        
+        Rows are pulled from the iterable one chunk at a time, so at most
+        chunksize rows are materialized as parameter dicts.
+        
+        Args:
+            table: Target table name
+            columns: Ordered mapping of column name to PostgreSQL type
+            rows: Iterable of tuples matching the column order
+            conn: Open connection to load within (committed by the caller)
+            chunksize: Rows per executemany call
+            
+        Returns:
+            Number of rows inserted, as reported by the driver
+        """
+        names = list(columns)
+        stmt = sql_table(table, *[column(name) for name in names]).insert()
+        rows = iter(rows)
+        inserted = 0
+        
+        with self._transaction(conn) as conn:
+            for batch in iter(lambda: list(islice(rows, chunksize)), []):
+                inserted += conn.execute(stmt, [dict(zip(names, row)) for row in batch]).rowcount
+        return inserted
+    
+    def load_customers(
+        self,
+        customers_df: pd.DataFrame,
+        conn: Optional[Connection] = None
+    ) -> int:
         """
         Load customer data into dim_customers table.
         
         Args:
             customers_df: DataFrame with customer data
+            conn: Open connection to load within (e.g. from bulk_transaction)
             
         Returns:
             Number of records loaded
         """
-        logger.info(f"Loading {len(customers_df)} customers...")
+        logger.info("Loading %d customers...", len(customers_df))
         
         try:
-            # Load data using pandas to_sql
-            records_loaded = customers_df.to_sql(
-                name='dim_customers',
-                con=self.engine,
-                if_exists='append',  # Append to existing table
-                index=False,
-                method='multi',  # Faster bulk insert
-                chunksize=1000
-            )
+            # Bulk load with binary COPY
+            loaded = self._copy_df(customers_df, 'dim_customers', CUSTOMER_COLUMNS, conn=conn)
             
-            logger.info(f"Successfully loaded {len(customers_df)} customers")
-            return len(customers_df)
+            logger.info("Successfully loaded %d customers", loaded)
+            return loaded
             
         except Exception as e:
-            logger.error(f"Failed to load customers: {str(e)}")
+            logger.error("Failed to load customers: %s", e)
             raise
     
-    def load_transactions(self, transactions_df: pd.DataFrame) -> int:
+    def load_transactions(
+        self,
+        transactions_df: pd.DataFrame,
+        conn: Optional[Connection] = None
+    ) -> int:
         """
         Load transaction data into fact_transactions table.
         
         Args:
             transactions_df: DataFrame with transaction data
+            conn: Open connection to load within (e.g. from bulk_transaction)
             
         Returns:
             Number of records loaded
         """
-        logger.info(f"Loading {len(transactions_df)} transactions...")
+        logger.info("Loading %d transactions...", len(transactions_df))
         
         try:
             # Prepare data for loading
-            load_df = transactions_df.copy()
-            
-            # Ensure datetime columns are properly formatted
-            if 'transaction_date' in load_df.columns:
-                load_df['transaction_date'] = pd.to_datetime(load_df['transaction_date'])
-            
-            if 'processed_at' in load_df.columns:
-                load_df['processed_at'] = pd.to_datetime(load_df['processed_at'])
-            
-            # Convert categorical columns to strings
-            categorical_cols = ['amount_category', 'risk_level']
-            for col in categorical_cols:
-                if col in load_df.columns:
-                    load_df[col] = load_df[col].astype(str)
-            
-            # Load data
-            records_loaded = load_df.to_sql(
-                name='fact_transactions',
-                con=self.engine,
-                if_exists='append',
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+            load_df = _prepare_transactions(transactions_df)
+            
+            # Bulk load with binary COPY into the unlogged staging table, then
+            # move the rows into fact_transactions in one set-based statement
+            with self._transaction(conn) as conn:
+                self._copy_df(load_df, 'stg_fact_transactions', TRANSACTION_COLUMNS, conn=conn)
+                loaded = _merge_staged_transactions(conn)
             
-            logger.info(f"Successfully loaded {len(transactions_df)} transactions")
-            return len(transactions_df)
+            logger.info("Successfully loaded %d transactions", loaded)
+            return loaded
             
         except Exception as e:
-            logger.error(f"Failed to load transactions: {str(e)}")
+            logger.error("Failed to load transactions: %s", e)
             raise
     
-    def start_audit_log(self, pipeline_name: str) -> int:
+    def write_transactions_parquet(self, transactions_df: pd.DataFrame, path) -> str:
+        """
+        Write transactions to a Parquet file typed for fact_transactions.
+        
+        Args:
+            transactions_df: DataFrame with transaction data
+            path: Output file path
+            
+        Returns:
+            Path of the written file
+        """
+        load_df = _prepare_transactions(transactions_df)
+        columns = {c: t for c, t in TRANSACTION_COLUMNS.items() if c in load_df.columns}
+        
+        schema = pa.schema([(c, PARQUET_TYPES[t]) for c, t in columns.items()])
+        table = pa.Table.from_pandas(load_df[list(columns)], schema=schema, preserve_index=False)
+        pq.write_table(table, path, compression='zstd')
+        
+        logger.info("Staged %d transactions to %s", table.num_rows, path)
+        return str(path)
+    
+    def load_transactions_from_parquet(
+        self,
+        path,
+        conn: Optional[Connection] = None
+    ) -> int:
+        """
+        Load transactions from a Parquet file read by the database server itself.
+        
+        Requires the pg_parquet extension, and the file must be readable by the
+        PostgreSQL server at the same path (see write_transactions_parquet).
+        
+        Args:
+            path: Parquet file path
+            conn: Open connection to load within (e.g. from bulk_transaction)
+            
+        Returns:
+            Number of records loaded
+        """
+        logger.info("Loading transactions from %s...", path)
+        
+        try:
+            statement = _parquet_copy_sql(path, pq.read_schema(path).names)
+            
+            # Run on the driver cursor without parameters, so no driver treats
+            # a % in the (already quoted) path as a placeholder
+            with self._transaction(conn) as conn:
+                with conn.connection.cursor() as cur:
+                    cur.execute(statement.as_string(None))
+                loaded = _merge_staged_transactions(conn)
+            
+            logger.info("Successfully loaded %d transactions", loaded)
+            return loaded
+            
+        except Exception as e:
+            logger.error("Failed to load transactions: %s", e)
+            raise
+    
+    async def aload_many(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, int]:
+        """
+        Load several tables concurrently over async connections.
+        
+        fact_transactions rows are copied into a stage table created for this
+        load, on a connection of their own, alongside the other tables. The
+        other tables, the merge of the staged rows and the stage's DROP run in
+        one transaction on a second connection, so either all tables are
+        loaded or none are (and the facts' foreign key to dim_customers
+        holds). On failure the stage is dropped on its own.
+        
+        Args:
+            frames: Mapping of table name (see TABLE_COLUMNS) to DataFrame
+            
+        Returns:
+            Number of records loaded per table
+        """
+        logger.info("Loading %s concurrently...", ', '.join(frames))
+        
+        conninfo = make_conninfo(
+            host=self.db_config['host'],
+            port=self.db_config['port'],
+            dbname=self.db_config['database'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            options=SESSION_OPTIONS
+        )
+        stage = LOAD_STAGE_PREFIX + uuid.uuid4().hex
+        
+        async def copy_frame(
+            aconn: AsyncConnection,
+            target: str,
+            column_types: Dict[str, str],
+            df: pd.DataFrame
+        ) -> int:
+            columns, arrays = _column_arrays(df, column_types)
+            async with aconn.cursor() as cur:
+                async with cur.copy(_copy_sql(target, columns)) as copy:
+                    copy.set_types(list(columns.values()))
+                    for row in zip(*arrays):
+                        await copy.write_row(row)
+                return cur.rowcount
+        
+        async def stage_transactions(df: pd.DataFrame) -> int:
+            # Leaving the connection block commits the stage and its rows
+            async with await AsyncConnection.connect(conninfo) as aconn:
+                await aconn.execute(CREATE_LOAD_STAGE.format(stage))
+                return await copy_frame(
+                    aconn, stage, TRANSACTION_COLUMNS, _prepare_transactions(df)
+                )
+        
+        async def load_tables(aconn: AsyncConnection) -> Dict[str, int]:
+            return {
+                table: await copy_frame(aconn, table, TABLE_COLUMNS[table], df)
+                for table, df in frames.items() if table != 'fact_transactions'
+            }
+        
+        staged = 'fact_transactions' in frames
+        
+        try:
+            # Leaving the connection block commits the other tables together
+            # with the merge, or rolls all of them back
+            async with await AsyncConnection.connect(conninfo) as aconn:
+                if staged:
+                    # Wait for both sides even if one fails, so the stage is
+                    # only dropped once nothing more can be written to it
+                    counts, staged_count = await asyncio.gather(
+                        load_tables(aconn),
+                        stage_transactions(frames['fact_transactions']),
+                        return_exceptions=True
+                    )
+                    for result in (counts, staged_count):
+                        if isinstance(result, BaseException):
+                            raise result
+                    
+                    counts['fact_transactions'] = (
+                        await aconn.execute(MERGE_LOAD_STAGE.format(stage))
+                    ).rowcount
+                    await aconn.execute(DROP_LOAD_STAGE.format(stage))
+                else:
+                    counts = await load_tables(aconn)
+            
+            logger.info("Successfully loaded %s", counts)
+            return {table: counts[table] for table in frames}
+            
+        except Exception as e:
+            logger.error("Failed to load tables: %s", e)
+            if staged:
+                await self._adrop_stage(conninfo, stage)
+            raise
+    
+    async def _adrop_stage(self, conninfo: str, stage: str):
+        """Drop a load's stage table after a failed load (it and its rows may have committed)"""
+        try:
+            async with await AsyncConnection.connect(conninfo) as aconn:
+                await aconn.execute(DROP_LOAD_STAGE.format(stage))
+        except Exception as e:
+            logger.error("Failed to drop %s: %s", stage, e)
+    
+    def start_audit_log(self, pipeline_name: str, conn: Optional[Connection] = None) -> int:
         """
         Create audit log entry for pipeline run.
         
         Args:
             pipeline_name: Name of the pipeline
+            conn: Open connection to reuse (committed by the caller)
             
         Returns:
             run_id for this execution
         """
-        logger.info(f"Starting audit log for {pipeline_name}")
+        logger.info("Starting audit log for %s", pipeline_name)
         
         try:
-            with self.engine.connect() as conn:
+            with self._transaction(conn) as conn:
                 result = conn.execute(
-                    text("""
-                        INSERT INTO etl_audit_log 
-                        (pipeline_name, start_time, status)
-                        VALUES (:pipeline_name, :start_time, :status)
-                        RETURNING run_id
-                    """),
+                    INSERT_AUDIT_LOG,
                     {
                         'pipeline_name': pipeline_name,
                         'start_time': datetime.now(),
                         'status': 'running'
                     }
                 )
-                conn.commit()
                 self.run_id = result.fetchone()[0]
             
-            logger.info(f"Created audit log entry with run_id: {self.run_id}")
+            logger.info("Created audit log entry with run_id: %s", self.run_id)
             return self.run_id
             
         except Exception as e:
-            logger.error(f"Failed to create audit log: {str(e)}")
+            logger.error("Failed to create audit log: %s", e)
             raise
     
     def update_audit_log(
@@ -190,7 +733,9 @@ class DataLoader:
         records_loaded: int = 0,
         records_rejected: int = 0,
         error_message: Optional[str] = None,
-        quality_report: Optional[Dict] = None
+        quality_report: Optional[Dict] = None,
+        conn: Optional[Connection] = None,
+        deferred: bool = False
     ):
         """
         Update audit log with pipeline execution results.
@@ -203,115 +748,230 @@ class DataLoader:
             records_rejected: Number of records rejected
             error_message: Error message if failed
             quality_report: Quality report dictionary
+            conn: Open connection to update within (committed by the caller)
+            deferred: Queue the update for the next flush_audit() instead of
+                      writing it now
         """
         if self.run_id is None:
             logger.warning("No run_id found, skipping audit log update")
             return
         
-        logger.info(f"Updating audit log (run_id: {self.run_id})")
+        logger.info("Updating audit log (run_id: %s)", self.run_id)
         
         try:
-            import json
-            
-            with self.engine.connect() as conn:
-                conn.execute(
-                    text("""
-                        UPDATE etl_audit_log 
-                        SET end_time = :end_time,
-                            status = :status,
-                            records_extracted = :records_extracted,
-                            records_transformed = :records_transformed,
-                            records_loaded = :records_loaded,
-                            records_rejected = :records_rejected,
-                            error_message = :error_message,
-                            quality_report = :quality_report
-                        WHERE run_id = :run_id
-                    """),
-                    {
-                        'run_id': self.run_id,
-                        'end_time': datetime.now(),
-                        'status': status,
-                        'records_extracted': records_extracted,
-                        'records_transformed': records_transformed,
-                        'records_loaded': records_loaded,
-                        'records_rejected': records_rejected,
-                        'error_message': error_message,
-                        'quality_report': json.dumps(quality_report) if quality_report else None
-                    }
-                )
-                conn.commit()
+            quality_json = (
+                orjson.dumps(quality_report, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+                if quality_report else None
+            )
+            
+            params = {
+                'run_id': self.run_id,
+                'end_time': datetime.now(),
+                'status': status,
+                'records_extracted': records_extracted,
+                'records_transformed': records_transformed,
+                'records_loaded': records_loaded,
+                'records_rejected': records_rejected,
+                'error_message': error_message,
+                'quality_report': quality_json
+            }
+            
+            if deferred:
+                with self._audit_lock:
+                    self._audit_queue.append(params)
+                logger.info("Audit log update queued")
+                return
+            
+            with self._transaction(conn) as conn:
+                conn.execute(UPDATE_AUDIT_LOG, params)
             
             logger.info("Audit log updated successfully")
             
         except Exception as e:
-            logger.error(f"Failed to update audit log: {str(e)}")
+            logger.error("Failed to update audit log: %s", e)
+            # Don't raise - audit failure shouldn't stop the pipeline
+    
+    def flush_audit(self, conn: Optional[Connection] = None) -> int:
+        """
+        Apply all queued audit updates in one statement.
+        
+        Args:
+            conn: Open connection to update within (committed by the caller)
+            
+        Returns:
+            Number of updates flushed
+        """
+        with self._audit_lock:
+            pending = self._audit_queue[:]
+            self._audit_queue.clear()
+        
+        if not pending:
+            return 0
+        
+        # One VALUES row per queued update, with numbered bind parameters
+        statement, params = _audit_update_statement(pending)
+        
+        try:
+            with self._transaction(conn) as conn:
+                conn.execute(statement, params)
+            
+            logger.info("Flushed %d audit log updates", len(pending))
+            return len(pending)
+            
+        except Exception as e:
+            logger.error("Failed to flush audit log: %s", e)
             # Don't raise - audit failure shouldn't stop the pipeline
+            return 0
     
-    def run_quality_checks(self, sql_file_path: str) -> pd.DataFrame:
+    def run_quality_checks(
+        self,
+        sql_file_path: str,
+        as_dataframe: bool = False,
+        conn: Optional[Connection] = None
+    ) -> Union[List[tuple], pd.DataFrame]:
         """
         Run data quality checks from SQL file.
         
         Args:
             sql_file_path: Path to SQL file with quality check queries
+            as_dataframe: Return a DataFrame instead of a list of row tuples
+            conn: Open connection to reuse (committed by the caller)
             
         Returns:
-            DataFrame with quality check results
+            Quality check results (row tuples, or a DataFrame if requested)
         """
         logger.info("Running data quality checks...")
         
         try:
-            with open(sql_file_path, 'r') as f:
-                sql_script = f.read()
-            
             # Execute last query which has the summary
-            queries = sql_script.split(';')
-            summary_query = queries[-2]  # Second to last (last is empty)
+            summary_query = _read_sql(sql_file_path)[-1]
             
-            results = pd.read_sql_query(summary_query, self.engine)
+            with self._transaction(conn) as conn:
+                result = conn.execute(text(summary_query))
+                columns = list(result.keys())
+                rows = [tuple(row) for row in result.fetchall()]
             
             logger.info("Quality checks completed")
-            logger.info(f"\n{results}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n" + "\n".join(
+                    "  ".join(str(value) for value in row) for row in [columns, *rows]
+                ))
             
-            return results
+            if as_dataframe:
+                return pd.DataFrame(rows, columns=columns)
+            return rows
             
         except Exception as e:
-            logger.error(f"Failed to run quality checks: {str(e)}")
+            logger.error("Failed to run quality checks: %s", e)
             raise
     
-    def get_table_counts(self) -> Dict[str, int]:
+    def get_table_counts(self, conn: Optional[Connection] = None) -> Dict[str, int]:
         """
         Get record counts for all tables.
         
+        Args:
+            conn: Open connection to reuse (committed by the caller)
+            
         Returns:
             Dictionary with table names and counts
         """
         logger.info("Getting table counts...")
         
         try:
-            with self.engine.connect() as conn:
-                tables = ['dim_customers', 'fact_transactions', 'etl_audit_log']
-                counts = {}
-                
-                for table in tables:
-                    result = conn.execute(
-                        text(f"SELECT COUNT(*) FROM {table}")
-                    )
-                    counts[table] = result.fetchone()[0]
+            tables = ['dim_customers', 'fact_transactions', 'etl_audit_log']
+            
+            # One roundtrip for all tables
+            query = " UNION ALL ".join(
+                f"SELECT '{table}', COUNT(*) FROM {table}" for table in tables
+            )
             
-            logger.info(f"Table counts: {counts}")
+            with self._transaction(conn) as conn:
+                counts = dict(conn.execute(text(query)).fetchall())
+            
+            logger.info("Table counts: %s", counts)
             return counts
             
         except Exception as e:
-            logger.error(f"Failed to get table counts: {str(e)}")
+            logger.error("Failed to get table counts: %s", e)
             return {}
     
     def close(self):
         """Close database connection"""
         if self.engine:
+            self.flush_audit()
             self.engine.dispose()
             logger.info("Database connection closed")
 
 
+class NullLoader:
+    """
+    Drop-in stand-in for DataLoader that never touches a database.
+    Used for dry runs and benchmarks of the extract/transform stages.
+    """
+    
+    def __init__(self):
+        self.engine = None
+        self.run_id = None
+        # Rows "staged" per Parquet path, reported back by load_transactions_from_parquet
+        self._staged_rows: Dict[str, int] = {}
+    
+    def create_schema(self, sql_file_path: str, conn=None):
+        pass
+    
+    def connect(self):
+        return None
+    
+    def bulk_mode(self, num_rows: int, table: str = 'fact_transactions'):
+        return nullcontext()
+    
+    def bulk_transaction(self):
+        return nullcontext()
+    
+    def load_customers(self, customers_df: pd.DataFrame, conn=None) -> int:
+        """Skip loading; returns the number of records that would be loaded"""
+        return len(customers_df)
+    
+    def load_transactions(self, transactions_df: pd.DataFrame, conn=None) -> int:
+        """Skip loading; returns the number of records that would be loaded"""
+        return len(transactions_df)
+    
+    def write_transactions_parquet(self, transactions_df: pd.DataFrame, path) -> str:
+        """Skip writing; remembers how many records the file would hold"""
+        self._staged_rows[str(path)] = len(transactions_df)
+        return str(path)
+    
+    def load_transactions_from_parquet(self, path, conn=None) -> int:
+        """Skip loading; returns the number of records that would be loaded"""
+        return self._staged_rows.pop(str(path), 0)
+    
+    async def aload_many(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, int]:
+        """Skip loading; returns the number of records that would be loaded per table"""
+        return {table: len(df) for table, df in frames.items()}
+    
+    def start_audit_log(self, pipeline_name: str, conn=None) -> int:
+        return 0
+    
+    def update_audit_log(self, status: str, **kwargs):
+        pass
+    
+    def flush_audit(self, conn=None) -> int:
+        return 0
+    
+    def run_quality_checks(
+        self,
+        sql_file_path: str,
+        as_dataframe: bool = False,
+        conn=None
+    ) -> Union[List[tuple], pd.DataFrame]:
+        return pd.DataFrame() if as_dataframe else []
+    
+    def get_table_counts(self, conn=None) -> Dict[str, int]:
+        return {}
+    
+    def close(self):
+        pass
+
+
 if __name__ == "__main__":
     # Test the loader
     from config import DB_CONFIG, RAW_DATA_DIR
@@ -4,6 +4,7 @@ Coordinates Extract, Transform, Load operations
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
 import logging
@@ -13,8 +14,10 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from extract import DataExtractor
 from transform import DataTransformer, DataQualityChecker
-from load import DataLoader
-from config import DB_CONFIG, RAW_DATA_DIR, PROCESSED_DATA_DIR
+from load import DataLoader, NullLoader
+from config import (
+    DB_CONFIG, RAW_DATA_DIR, PROCESSED_DATA_DIR, PARQUET_LOAD, TRANSFORM_ENGINE, CHUNK_ROWS
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +25,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Log banners, built once
+BANNER = "=" * 80
+SECTION_BANNER = "\n" + BANNER
+
+# Worker threads for overlapping stages; matches the loader's connection pool size
+MAX_WORKERS = 4
+
 
 class ETLPipeline:
     """
@@ -29,11 +39,15 @@ class ETLPipeline:
     Demonstrates: End-to-end pipeline, error handling, monitoring
     """
     
-    def __init__(self):
+    def __init__(self, dry_run: bool = False):
+        """
+        Args:
+            dry_run: Skip the database entirely (no connection, loads or audit log)
+        """
         self.extractor = DataExtractor(RAW_DATA_DIR)
-        self.transformer = DataTransformer()
+        self.transformer = DataTransformer(engine=TRANSFORM_ENGINE)
         self.quality_checker = DataQualityChecker()
-        self.loader = DataLoader(DB_CONFIG)
+        self.loader = NullLoader() if dry_run else DataLoader(DB_CONFIG)
         self.run_id = None
     
     def run(self, num_transactions: int = 10000, num_customers: int = 5000):
@@ -44,109 +58,173 @@ class ETLPipeline:
             num_transactions: Number of transactions to process
             num_customers: Number of customers to process
         """
-        logger.info("="*80)
+        logger.info(BANNER)
         logger.info("STARTING ETL PIPELINE")
-        logger.info("="*80)
+        logger.info(BANNER)
         
         start_time = datetime.now()
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        control_conn = None
         
         try:
+            # One autocommit connection for the audit log and bookkeeping queries;
+            # the bulk load runs in its own transaction
+            control_conn = self.loader.connect()
+            
             # Start audit log
-            self.run_id = self.loader.start_audit_log('financial_etl_pipeline')
+            self.run_id = self.loader.start_audit_log('financial_etl_pipeline', conn=control_conn)
             
             # EXTRACT
-            logger.info("\n" + "="*80)
+            logger.info(SECTION_BANNER)
             logger.info("PHASE 1: EXTRACT")
-            logger.info("="*80)
+            logger.info(BANNER)
             raw_customers = self.extractor.extract_customers(num_customers)
-            raw_transactions = self.extractor.extract_transactions(num_transactions)
-            logger.info(f"✓ Extracted {len(raw_customers)} customers")
-            logger.info(f"✓ Extracted {len(raw_transactions)} transactions")
-            
-            # TRANSFORM
-            logger.info("\n" + "="*80)
-            logger.info("PHASE 2: TRANSFORM")
-            logger.info("="*80)
-            clean_transactions = self.transformer.transform_transactions(raw_transactions)
-            logger.info(f"✓ Transformed {len(clean_transactions)} transactions")
-            
-            # Validate against customers
-            clean_transactions = self.transformer.validate_against_customers(
-                clean_transactions,
-                raw_customers
-            )
-            logger.info(f"✓ Validated against customer data")
-            
-            # Quality checks
-            logger.info("\nRunning quality checks...")
-            quality_passed = self.quality_checker.run_quality_checks(
-                clean_transactions,
-                "transactions"
-            )
+            logger.info("✓ Extracted %d customers", len(raw_customers))
             
-            if not quality_passed:
-                logger.warning("⚠ Quality checks failed but continuing...")
-            else:
-                logger.info("✓ Quality checks passed")
+            # Both loads share one transaction with relaxed durability; customers
+            # need no transformation, so they load while the first chunk of
+            # transactions is extracted and transformed.
+            # Large loads also drop the fact table's indexes until the load commits
+            with self.loader.bulk_mode(num_transactions), \
+                    self.loader.bulk_transaction() as conn:
+                customers_future = executor.submit(
+                    self.loader.load_customers, raw_customers, conn=conn
+                )
+                records_extracted = records_transformed = transactions_loaded = 0
+                quality_passed = True
+                
+                try:
+                    # TRANSFORM + LOAD, one chunk of transactions at a time
+                    logger.info(SECTION_BANNER)
+                    logger.info("PHASE 2: TRANSFORM AND LOAD (chunks of up to %d)", CHUNK_ROWS)
+                    logger.info(BANNER)
+                    chunks = self.extractor.iter_transactions(num_transactions, chunk_size=CHUNK_ROWS)
+                    for chunk_number, raw_chunk in enumerate(chunks):
+                        records_extracted += len(raw_chunk)
+                        # Don't fork the transform's workers while the customers
+                        # load thread may hold a lock they would inherit
+                        if self.transformer.forks_workers(len(raw_chunk)):
+                            customers_future.result()
+                        clean_chunk = self.transformer.transform_chunk(raw_chunk)
+                        
+                        # Validate against customers
+                        clean_chunk = self.transformer.validate_against_customers(
+                            clean_chunk,
+                            raw_customers
+                        )
+                        records_transformed += len(clean_chunk)
+                        
+                        # Quality checks
+                        if not self.quality_checker.run_quality_checks(
+                            clean_chunk,
+                            f"transactions chunk {chunk_number}"
+                        ):
+                            quality_passed = False
+                        
+                        # The customers load shares conn; the first chunk waits for it
+                        customers_future.result()
+                        chunk_loaded = self._load_transactions(clean_chunk, chunk_number, conn)
+                        transactions_loaded += chunk_loaded
+                        logger.info(
+                            "✓ Chunk %d: %d extracted, %s loaded",
+                            chunk_number, len(raw_chunk), chunk_loaded
+                        )
+                    
+                    logger.info("✓ Extracted %d transactions", records_extracted)
+                    logger.info("✓ Transformed and validated %d transactions", records_transformed)
+                    
+                    if not quality_passed:
+                        logger.warning("⚠ Quality checks failed but continuing...")
+                    else:
+                        logger.info("✓ Quality checks passed")
+                finally:
+                    # Close the stream even on failure, so a reused transformer
+                    # doesn't treat the next run's IDs as cross-chunk duplicates
+                    self.transformer.on_complete()
+                    # Let the customers load finish before the transaction
+                    # commits or rolls back
+                    wait([customers_future])
+                
+                customers_loaded = customers_future.result()
             
-            # LOAD
-            logger.info("\n" + "="*80)
-            logger.info("PHASE 3: LOAD")
-            logger.info("="*80)
-            customers_loaded = self.loader.load_customers(raw_customers)
-            transactions_loaded = self.loader.load_transactions(clean_transactions)
-            logger.info(f"✓ Loaded {customers_loaded} customers")
-            logger.info(f"✓ Loaded {transactions_loaded} transactions")
+            logger.info("✓ Loaded %s customers", customers_loaded)
+            logger.info("✓ Loaded %s transactions", transactions_loaded)
             
             # Update audit log
             self.loader.update_audit_log(
                 status='success',
-                records_extracted=len(raw_transactions),
-                records_transformed=len(clean_transactions),
+                records_extracted=records_extracted,
+                records_transformed=records_transformed,
                 records_loaded=transactions_loaded,
-                records_rejected=len(raw_transactions) - len(clean_transactions),
-                quality_report=self.transformer.get_quality_report()
+                records_rejected=records_extracted - records_transformed,
+                quality_report=self.transformer.get_quality_report(),
+                conn=control_conn
             )
             
             # Final summary
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             
-            logger.info("\n" + "="*80)
+            logger.info(SECTION_BANNER)
             logger.info("PIPELINE COMPLETED SUCCESSFULLY")
-            logger.info("="*80)
-            logger.info(f"Duration: {duration:.2f} seconds")
-            logger.info(f"Records extracted: {len(raw_transactions)}")
-            logger.info(f"Records transformed: {len(clean_transactions)}")
-            logger.info(f"Records loaded: {transactions_loaded}")
-            logger.info(f"Records rejected: {len(raw_transactions) - len(clean_transactions)}")
-            logger.info(f"Success rate: {(transactions_loaded/len(raw_transactions)*100):.2f}%")
+            logger.info(BANNER)
+            logger.info("Duration: %.2f seconds", duration)
+            logger.info("Records extracted: %d", records_extracted)
+            logger.info("Records transformed: %d", records_transformed)
+            logger.info("Records loaded: %s", transactions_loaded)
+            logger.info("Records rejected: %d", records_extracted - records_transformed)
+            logger.info("Success rate: %.2f%%", transactions_loaded/records_extracted*100)
             
             # Get final table counts
             logger.info("\nFinal database state:")
-            counts = self.loader.get_table_counts()
+            counts = self.loader.get_table_counts(conn=control_conn)
             for table, count in counts.items():
-                logger.info(f"  {table}: {count:,} records")
+                logger.info("  %s: %s records", table, format(count, ','))
             
             return True
             
         except Exception as e:
-            logger.error(f"\n{'='*80}")
+            logger.error(SECTION_BANNER)
             logger.error("PIPELINE FAILED")
-            logger.error(f"{'='*80}")
-            logger.error(f"Error: {str(e)}")
+            logger.error(BANNER)
+            logger.error("Error: %s", e)
             
             # Update audit log with failure
             if self.run_id:
                 self.loader.update_audit_log(
                     status='failed',
-                    error_message=str(e)
+                    error_message=str(e),
+                    conn=control_conn
                 )
             
             raise
             
         finally:
+            executor.shutdown(wait=True)
+            if control_conn is not None:
+                control_conn.close()
             self.loader.close()
+    
+    def _load_transactions(self, clean_chunk, chunk_number: int, conn) -> int:
+        """
+        Load one chunk of clean transactions inside the bulk transaction.
+        
+        Returns:
+            Number of rows loaded
+        """
+        if PARQUET_LOAD:
+            # Stage as Parquet and let the database read it directly
+            parquet_path = self.loader.write_transactions_parquet(
+                clean_chunk,
+                PROCESSED_DATA_DIR / f"txn_{self.run_id}_{chunk_number}.parquet"
+            )
+            try:
+                return self.loader.load_transactions_from_parquet(parquet_path, conn=conn)
+            finally:
+                # The server has read the file by the time COPY returns (or failed)
+                Path(parquet_path).unlink(missing_ok=True)
+        
+        return self.loader.load_transactions(clean_chunk, conn=conn)
 
 
 def main():
@@ -167,10 +245,16 @@ def main():
         help='Number of customers to process (default: 5000)'
     )
     
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Extract and transform only; skip all database work'
+    )
+    
     args = parser.parse_args()
     
     # Run pipeline
-    pipeline = ETLPipeline()
+    pipeline = ETLPipeline(dry_run=args.dry_run)
     pipeline.run(
         num_transactions=args.transactions,
         num_customers=args.customers
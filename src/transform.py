@@ -3,15 +3,365 @@ Data Transformation Module
 Cleans, validates, and transforms raw data for loading
 """
 
+import os
+import multiprocessing
 import pandas as pd
 import numpy as np
-from datetime import datetime
-from typing import Dict, List, Tuple
+import pyarrow as pa
+import pyarrow.compute as pc
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple, Union
 import logging
+from functools import reduce
+
+try:
+    from numba import config as numba_config, njit, prange
+except ImportError:  # optional; risk scores fall back to a NumPy expression
+    njit = None
+else:
+    # Forked pool workers abort under GNU OpenMP (the default layer on Linux)
+    # and hang at exit under TBB once the parent has run a parallel kernel.
+    # workqueue survives a fork; it isn't thread-safe, but kernels only ever
+    # run on the main thread. A layer chosen through NUMBA_THREADING_LAYER or
+    # numba.config is left alone
+    if numba_config.THREADING_LAYER == 'default':
+        numba_config.THREADING_LAYER = 'workqueue'
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Engines DataTransformer can run the transaction pipeline on
+TRANSFORM_ENGINES = ('pandas', 'polars')
+
+# Normalized string columns are kept as Arrow UTF-8 buffers rather than Python objects
+STRING_DTYPE = pd.ArrowDtype(pa.large_string())
+
+# Upper bin edges (right-closed) and labels for the derived bucket columns
+AMOUNT_BINS = np.array([50, 200, 500, 1000], dtype=np.float32)
+AMOUNT_LABELS = ['small', 'medium', 'large', 'very_large', 'exceptional']
+RISK_BINS = np.array([20, 50, 80], dtype=np.float32)
+RISK_LABELS = ['low', 'medium', 'high', 'critical']
+
+VALID_STATUSES = ['completed', 'pending', 'failed']
+
+# Oldest transaction the business rules accept
+MAX_TRANSACTION_AGE = timedelta(days=730)
+
+# Fields that must be present and non-null in transformed transactions
+REQUIRED_FIELDS = [
+    'transaction_id', 'customer_id', 'transaction_date',
+    'amount', 'merchant_id', 'category', 'status',
+    'payment_method', 'risk_score', 'risk_level'
+]
+
+# Below this many rows, forking workers costs more than it saves
+PARALLEL_MIN_ROWS = 1_000_000
+
+# Strings the Arrow transform parses leniently when a plain cast fails: ISO
+# dates with optional time and fractional seconds, and decimal numbers
+TIMESTAMP_PATTERN = (
+    r'^\s*(?P<seconds>\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?)'
+    r'(?P<fraction>\.\d{1,6})?\s*$'
+)
+TIMESTAMP_LAYOUTS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+NUMBER_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)(e[-+]?\d+)?$|^[-+]?(inf|infinity|nan)$'
+
+# Transformer and deduplicated frame shared with forked pool workers
+# (inherited, never pickled)
+_fork_source = None
+
+# Set in forked pool workers
+_in_worker = False
+
+
+def _fill_missing(series: pd.Series, value) -> pd.Series:
+    """fillna that also works on categorical columns lacking the fill value"""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def _normalize_strings(series: pd.Series, upper: bool) -> pd.Series:
+    """Trim and upper/lower-case a string column with Arrow kernels, keeping it Arrow-backed"""
+    if isinstance(series.dtype, pd.ArrowDtype):
+        arr = series.array._pa_array
+    else:
+        arr = pa.array(series, type=pa.large_string(), from_pandas=True)
+    
+    arr = pc.utf8_trim_whitespace(arr)
+    arr = pc.utf8_upper(arr) if upper else pc.utf8_lower(arr)
+    return pd.Series(pd.array(arr, dtype=STRING_DTYPE), index=series.index, name=series.name)
+
+
+def _normalize_categorical(series: pd.Series, upper: bool) -> pd.Series:
+    """
+    Trim and upper/lower-case a low-cardinality column as a Categorical.
+    
+    Only the distinct values are normalized; categories that collapse into
+    one (e.g. 'Failed' and 'failed ') are merged by remapping their codes.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    
+    categories = _normalize_strings(pd.Series(series.cat.categories), upper)
+    remap, merged = pd.factorize(categories.to_numpy(dtype=object))
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, remap[codes], -1)
+    
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=merged),
+        index=series.index,
+        name=series.name
+    )
+
+
+def _isin(series: pd.Series, values: List[str]) -> np.ndarray:
+    """Membership mask; categorical columns compare int codes instead of strings"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.categories.get_indexer(values)
+        return np.isin(series.cat.codes.to_numpy(), codes[codes >= 0])
+    return series.isin(values).to_numpy(dtype=bool, na_value=False)
+
+
+def _seen_before(seen: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mark the IDs already in seen and merge the rest into it.
+    
+    seen is a sorted array of UTF-8 encoded IDs (one fixed-width bytes
+    buffer rather than a Python string per ID), so each chunk is one
+    binary search per ID plus one memcpy-speed insert, not a rebuild of a
+    hash table over every earlier ID.
+    
+    Args:
+        seen: Sorted unique IDs of earlier chunks
+        ids: This chunk's (unique) IDs
+        
+    Returns:
+        Mask of the IDs found in seen, and the updated seen array
+    """
+    ids = np.char.encode(ids.astype(str), 'utf-8')
+    dtype = np.promote_types(seen.dtype, ids.dtype)
+    seen, ids = seen.astype(dtype, copy=False), ids.astype(dtype, copy=False)
+    
+    positions = np.searchsorted(seen, ids)
+    repeated = positions < len(seen)
+    repeated[repeated] = seen[positions[repeated]] == ids[repeated]
+    
+    fresh = np.sort(ids[~repeated])
+    return repeated, np.insert(seen, np.searchsorted(seen, fresh), fresh)
+
+
+def _null_counts(df: Union[pd.DataFrame, pa.Table]) -> Dict[str, int]:
+    """
+    Per-column null counts without materializing a boolean mask where avoidable.
+    
+    Arrow tables and Arrow-backed columns report the count kept with their
+    validity bitmaps, and integer/bool NumPy columns cannot hold nulls at all.
+    """
+    if isinstance(df, pa.Table):
+        return {name: df[name].null_count for name in df.column_names}
+    
+    counts = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.ArrowDtype):
+            counts[column] = series.array._pa_array.null_count
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biu':
+            counts[column] = 0
+        else:
+            counts[column] = int(series.isna().sum())
+    return counts
+
+
+def _hot_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    The values the business rules and derived fields read, as contiguous arrays.
+    
+    Built once per frame (structure of arrays) and filtered alongside it, so
+    steps 4-5 never go back to the DataFrame's blocks.
+    """
+    return {
+        'amount': df['amount'].to_numpy(dtype=np.float64),
+        # Microseconds since the epoch
+        'timestamp': df['transaction_date'].to_numpy(dtype='datetime64[us]').view(np.int64),
+        'valid_status': _isin(df['status'], VALID_STATUSES),
+        'failed': _isin(df['status'], ['failed']),
+    }
+
+
+def _with_columns(df: pd.DataFrame, columns: Dict[str, object]) -> pd.DataFrame:
+    """Append columns with one frame construction rather than one insert per column"""
+    return pd.DataFrame({**dict(df.items()), **columns}, index=df.index, copy=False)
+
+
+def _date_parts(timestamps: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Year, month, day, weekday (Monday=0) and hour from one read of the timestamps.
+    
+    Works on microseconds since the epoch with integer arithmetic only
+    (Hinnant's days-to-civil algorithm), instead of one .dt pass per part.
+    """
+    days, day_seconds = np.divmod(timestamps // 1_000_000, 86400)
+    
+    # Shift the epoch to 0000-03-01 so leap days fall at the end of each year
+    era, day_of_era = np.divmod(days + 719468, 146097)
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153
+    month = np.where(month_index < 10, month_index + 3, month_index - 9)
+    
+    return {
+        'transaction_year': (year_of_era + era * 400 + (month <= 2)).astype(np.int16),
+        'transaction_month': month.astype(np.int8),
+        'transaction_day': (day_of_year - (153 * month_index + 2) // 5 + 1).astype(np.int8),
+        # 1970-01-01 was a Thursday
+        'transaction_dayofweek': ((days + 3) % 7).astype(np.int8),
+        'transaction_hour': (day_seconds // 3600).astype(np.int8),
+    }
+
+
+def _arrow_strings(column: pa.ChunkedArray, upper: bool) -> pa.ChunkedArray:
+    """Trim and upper/lower-case an Arrow string column (dictionary columns are decoded)"""
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    column = pc.utf8_trim_whitespace(column)
+    return pc.utf8_upper(column) if upper else pc.utf8_lower(column)
+
+
+def _is_text(column: pa.ChunkedArray) -> bool:
+    return pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+
+
+def _arrow_timestamps(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """
+    Timestamps from an Arrow column, with unparseable strings as null
+    (like pd.to_datetime(errors='coerce')).
+    """
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    try:
+        return column.cast(pa.timestamp('us'))
+    except pa.ArrowInvalid:
+        if not _is_text(column):
+            raise
+    
+    # Some strings don't parse: split off the fractional seconds, parse the
+    # rest with each accepted layout and keep only exact round trips (so
+    # e.g. February 30th is null rather than rolled over)
+    parts = pc.extract_regex(column, TIMESTAMP_PATTERN)
+    text = pc.replace_substring(pc.struct_field(parts, [0]), 'T', ' ')
+    seconds = pc.coalesce(*[
+        pc.if_else(pc.equal(pc.strftime(parsed, format=layout), text), parsed, None)
+        for layout in TIMESTAMP_LAYOUTS
+        for parsed in [pc.strptime(text, format=layout, unit='s', error_is_null=True)]
+    ])
+    fraction = pc.utf8_slice_codeunits(pc.utf8_rpad(pc.struct_field(parts, [1]), 7, '0'), 1, 7)
+    return pc.add(seconds.cast(pa.timestamp('us')), fraction.cast(pa.int64()).cast(pa.duration('us')))
+
+
+def _arrow_floats(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Floats from an Arrow column, with non-numeric strings as null (like pd.to_numeric(errors='coerce'))"""
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    try:
+        return column.cast(pa.float64())
+    except pa.ArrowInvalid:
+        if not _is_text(column):
+            raise
+    column = pc.utf8_trim_whitespace(column)
+    numeric = pc.match_substring_regex(column, NUMBER_PATTERN, ignore_case=True)
+    return pc.if_else(numeric, column, None).cast(pa.float64())
+
+
+def _arrow_cut(values: np.ndarray, bins: np.ndarray, labels: List[str]) -> pa.DictionaryArray:
+    """_fast_cut for Arrow: bin numbers become the indices of a dictionary array"""
+    codes = np.searchsorted(bins, values, side='left').astype(np.int8)
+    return pa.DictionaryArray.from_arrays(codes, pa.array(labels))
+
+
+def _fast_cut(values: np.ndarray, bins: np.ndarray, labels: List[str]) -> pd.Categorical:
+    """
+    Bucket values into right-closed bins with a binary search per value.
+    
+    Equivalent to pd.cut with -inf/inf outer edges, without building an
+    IntervalIndex: the bin number is used directly as the categorical code.
+    """
+    codes = np.searchsorted(bins, values, side='left')
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+if njit is not None:
+    def _risk_rules(amount, failed, dayofweek, hour, out):
+        """Per-row risk rules, compiled below"""
+        for i in prange(amount.shape[0]):
+            r = 0.0
+            # High amount = higher risk
+            if amount[i] > 5000:
+                r += 30
+            if amount[i] > 10000:
+                r += 40
+            # Failed status = higher risk
+            if failed[i]:
+                r += 50
+            # Weekend transactions = slightly higher risk
+            if dayofweek[i] >= 5:
+                r += 10
+            # Late night transactions = higher risk
+            if hour[i] < 6:
+                r += 20
+            out[i] = r
+    
+    # Threaded build for the main process; forked pool workers use the serial
+    # one, since numba's thread pool does not survive a fork. Not cached: both
+    # builds would share one on-disk cache entry for _risk_rules, and the entry
+    # is pickled under whichever name (transform or src.transform) the module
+    # was imported as
+    _risk_kernel = njit(parallel=True)(_risk_rules)
+    _risk_kernel_serial = njit(_risk_rules)
+
+
+def _risk_scores(
+    amount: np.ndarray,
+    failed: np.ndarray,
+    dayofweek: np.ndarray,
+    hour: np.ndarray
+) -> np.ndarray:
+    """
+    Risk score per row: 30/40 for amounts over $5k/$10k, 50 for failed
+    status, 10 on weekends and 20 between midnight and 6am.
+    
+    Uses the compiled kernel when numba is installed, otherwise one
+    vectorized pass summing the weighted rule masks.
+    """
+    if njit is not None:
+        out = np.empty(amount.shape[0], dtype=np.float32)
+        kernel = _risk_kernel_serial if _in_worker else _risk_kernel
+        kernel(amount, failed, dayofweek, hour, out)
+        return out
+    
+    # int16, since the weights add up to 150 and would wrap around in int8
+    risk = (
+        (amount > 5000).astype(np.int16) * 30
+        + (amount > 10000).astype(np.int16) * 40
+        + failed.astype(np.int16) * 50
+        + (dayofweek >= 5).astype(np.int16) * 10
+        + (hour < 6).astype(np.int16) * 20
+    )
+    return risk.astype(np.float32)
+
+
+def _init_worker():
+    """Pool initializer: mark the process as a forked worker"""
+    global _in_worker
+    _in_worker = True
+
+
+def _transform_rows(bounds: Tuple[int, int]) -> pd.DataFrame:
+    """Pool worker: run steps 2-5 on one row range of the frame inherited from the parent"""
+    start, stop = bounds
+    transformer, df = _fork_source
+    return transformer._clean_and_enrich(df.iloc[start:stop])
+
 
 class DataTransformer:
     """
@@ -19,10 +369,23 @@ class DataTransformer:
     Demonstrates: Data cleaning, validation, quality controls, business rules
     """
     
-    def __init__(self):
+    def __init__(self, engine: str = 'pandas', workers: int = None):
+        """
+        Args:
+            engine: 'pandas' runs each step as its own pass; 'polars' runs the
+                    whole pipeline as one lazy query (needs the polars package)
+            workers: Processes for the pandas engine on frames of at least
+                     PARALLEL_MIN_ROWS rows (defaults to the CPU count; 1 disables)
+        """
+        if engine not in TRANSFORM_ENGINES:
+            raise ValueError(f"Unknown transform engine: {engine}")
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self.run_time = None
+        self._stream = None
         self.quality_report = {}
         
-    def transform_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+    def transform_transactions(self, df: Union[pd.DataFrame, pa.Table]) -> pd.DataFrame:
         """
         Complete transformation pipeline for transactions.
         
@@ -35,55 +398,374 @@ class DataTransformer:
         6. Generate quality report
         
         Args:
-            df: Raw transaction DataFrame
+            df: Raw transaction DataFrame, or an Arrow table (e.g. read from
+                a Feather file), which is consumed by the conversion to pandas
             
         Returns:
             Cleaned and transformed DataFrame
         """
         logger.info("Starting transaction transformation...")
         
+        # One reference time for the date rules and processed_at across the run
+        self.run_time = datetime.now()
+        
         # Store initial row count
-        initial_count = len(df)
+        initial_count = len(df) if isinstance(df, pd.DataFrame) else df.num_rows
         
-        # Step 1: Remove duplicates
-        df = self._remove_duplicates(df)
+        if self.engine == 'polars':
+            # Steps 1-5 as a single lazy query
+            df = self._transform_polars(df)
+        else:
+            if isinstance(df, pa.Table):
+                df = df.to_pandas(split_blocks=True, self_destruct=True)
+            
+            # Step 1: Remove duplicates (global, so it runs before any split)
+            df = self._remove_duplicates(df)
+            
+            # Steps 2-5
+            df = self._transform_steps(df)
         
-        # Step 2: Handle missing values
-        df = self._handle_missing_values(df)
+        # Step 6: Validate final data
+        df = self._final_validation(df)
         
-        # Step 3: Validate and fix data types
-        df = self._validate_data_types(df)
+        self._record_quality_report(initial_count, len(df), _null_counts(df))
+        return df
+    
+    def transform_transactions_arrow(self, table: pa.Table) -> pa.Table:
+        """
+        Complete transformation pipeline for transactions, kept in Arrow.
         
-        # Step 4: Apply business rules
-        df = self._apply_business_rules(df)
+        Same steps, rules and output columns as transform_transactions, but
+        run with pyarrow.compute kernels so the data never passes through
+        pandas; callers convert only at their own boundary.
         
-        # Step 5: Add derived fields
-        df = self._add_derived_fields(df)
+        Args:
+            table: Raw transaction Arrow table
+            
+        Returns:
+            Cleaned and transformed Arrow table
+        """
+        logger.info("Starting transaction transformation (Arrow)...")
+        
+        self.run_time = datetime.now()
+        initial_count = table.num_rows
+        
+        # Step 1: Remove duplicates, keeping the first row per transaction_id
+        ids = table['transaction_id']
+        if pa.types.is_dictionary(ids.type):
+            ids = ids.cast(ids.type.value_type)
+        first_rows = pa.table({
+            'transaction_id': ids,
+            'row': pa.array(np.arange(initial_count))
+        }).group_by('transaction_id').aggregate([('row', 'min')])['row_min']
+        table = table.take(np.sort(first_rows.to_numpy()))
+        
+        # Steps 2-3: fill non-critical fields, fix types, standardize strings
+        columns = {
+            'transaction_id': _arrow_strings(table['transaction_id'], upper=True),
+            'customer_id': _arrow_strings(table['customer_id'], upper=True),
+            'transaction_date': _arrow_timestamps(table['transaction_date']),
+            'amount': _arrow_floats(table['amount']),
+            'merchant_id': pc.fill_null(_arrow_strings(table['merchant_id'], upper=True), 'MERCH0000'),
+            'category': pc.fill_null(_arrow_strings(table['category'], upper=False), 'unknown'),
+            'status': _arrow_strings(table['status'], upper=False),
+            'payment_method': _arrow_strings(table['payment_method'], upper=False),
+        }
+        
+        # Steps 2 and 4: missing critical fields, failed conversions and all
+        # business rules as one filter
+        now = pa.scalar(self.run_time, type=pa.timestamp('us'))
+        two_years_ago = pa.scalar(self.run_time - MAX_TRANSACTION_AGE, type=pa.timestamp('us'))
+        amount, dates = columns['amount'], columns['transaction_date']
+        keep = reduce(pc.and_, [
+            pc.is_valid(columns['transaction_id']),
+            pc.is_valid(columns['customer_id']),
+            pc.greater(amount, 0),
+            pc.less_equal(amount, 1_000_000),
+            pc.is_in(columns['status'], value_set=pa.array(VALID_STATUSES)),
+            pc.less_equal(dates, now),
+            pc.greater_equal(dates, two_years_ago),
+        ])
+        table = pa.table(
+            {name: columns.get(name, table[name]) for name in table.column_names}
+        ).filter(pc.fill_null(keep, False))
+        
+        removed = initial_count - table.num_rows
+        if removed > 0:
+            logger.warning(f"Removed {removed} transactions that failed cleaning or business rules")
+        
+        # Step 5: derived fields
+        dates = table['transaction_date']
+        amount = table['amount'].to_numpy()
+        dayofweek = pc.day_of_week(dates).cast(pa.int8())
+        hour = pc.hour(dates).cast(pa.int8())
+        risk_score = _risk_scores(
+            amount,
+            pc.equal(table['status'], 'failed').to_numpy(),
+            dayofweek.to_numpy(),
+            hour.to_numpy()
+        )
+        derived = {
+            'transaction_year': pc.year(dates).cast(pa.int16()),
+            'transaction_month': pc.month(dates).cast(pa.int8()),
+            'transaction_day': pc.day(dates).cast(pa.int8()),
+            'transaction_dayofweek': dayofweek,
+            'transaction_hour': hour,
+            'amount_category': _arrow_cut(amount, AMOUNT_BINS, AMOUNT_LABELS),
+            'risk_score': pa.array(risk_score),
+            'risk_level': _arrow_cut(risk_score, RISK_BINS, RISK_LABELS),
+            'processed_at': pa.repeat(now, table.num_rows),
+        }
+        for name, column in derived.items():
+            table = table.append_column(name, column)
         
         # Step 6: Validate final data
+        table = self._final_validation(table)
+        
+        self._record_quality_report(initial_count, table.num_rows, _null_counts(table))
+        return table
+    
+    def transform_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transform one chunk of a streamed extract (see DataExtractor.iter_transactions).
+        
+        Runs the same steps as transform_transactions on the chunk alone.
+        Duplicates are removed within the chunk and against the IDs of all
+        earlier chunks; record counts accumulate until on_complete().
+        
+        Args:
+            df: Raw transaction chunk
+            
+        Returns:
+            Cleaned and transformed chunk
+        """
+        if self._stream is None:
+            self.run_time = datetime.now()
+            self._stream = {'initial': 0, 'final': 0, 'null_counts': {}, 'seen_ids': np.array([], dtype='S1')}
+        stream = self._stream
+        stream['initial'] += len(df)
+        
+        # Step 1: Remove duplicates, then IDs already seen in earlier chunks
+        df = self._remove_duplicates(df)
+        repeated, stream['seen_ids'] = _seen_before(
+            stream['seen_ids'], df['transaction_id'].to_numpy(dtype=object)
+        )
+        if repeated.any():
+            logger.warning(f"Removed {repeated.sum()} transactions duplicated from earlier chunks")
+            df = df[~repeated]
+        
+        # Steps 2-6
+        if self.engine == 'polars':
+            df = self._transform_polars(df)
+        else:
+            df = self._transform_steps(df)
         df = self._final_validation(df)
         
-        # Generate quality report
-        final_count = len(df)
+        stream['final'] += len(df)
+        for column, count in _null_counts(df).items():
+            stream['null_counts'][column] = stream['null_counts'].get(column, 0) + count
+        return df
+    
+    def on_complete(self) -> Dict:
+        """
+        Finish a streamed transform: write the quality report for all chunks
+        and reset for the next stream.
+        
+        Returns:
+            The transactions quality report
+        """
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            self._record_quality_report(stream['initial'], stream['final'], stream['null_counts'])
+        return self.quality_report.get('transactions', {})
+    
+    def _record_quality_report(self, initial_count: int, final_count: int, null_counts: Dict[str, int]):
+        """Store the quality report for a finished transaction transform"""
         self.quality_report['transactions'] = {
             'initial_records': initial_count,
             'final_records': final_count,
             'records_removed': initial_count - final_count,
             'removal_percentage': ((initial_count - final_count) / initial_count * 100) if initial_count > 0 else 0,
-            'null_counts': df.isnull().sum().to_dict(),
+            'null_counts': null_counts,
             'timestamp': datetime.now().isoformat()
         }
         
         logger.info(f"Transformation complete. Records: {initial_count} → {final_count}")
-        return df
+    
+    def _now(self) -> datetime:
+        """Reference time of the current run (or now, outside transform_transactions)"""
+        return self.run_time or datetime.now()
+    
+    def _clean_and_enrich(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Steps 2-5 of the pandas engine, which only look at one row at a time.
+        """
+        # Steps 2-4 only clear rows in one mask; the frame is filtered once
+        # Step 2: Handle missing values
+        alive = self._missing_value_mask(df)
+        df = self._fill_missing_values(df)
+        
+        # Step 3: Validate and fix data types
+        df, converted = self._convert_types(df)
+        alive &= converted
+        df = self._standardize_fields(df)
+        
+        # Step 4: Apply business rules, on the hot arrays shared with step 5
+        hot = _hot_columns(df)
+        alive = self._business_rule_mask(hot, alive)
+        
+        rows = np.flatnonzero(alive)
+        df = df.iloc[rows].reset_index(drop=True)
+        hot = {name: values[rows] for name, values in hot.items()}
+        
+        # Step 5: Add derived fields
+        return _with_columns(df, self._derived_columns(hot))
+    
+    def forks_workers(self, num_rows: int) -> bool:
+        """
+        Whether transforming num_rows rows forks a pool of worker processes.
+        
+        Callers running other threads (e.g. a concurrent load) should let them
+        finish first: a fork copies any lock those threads hold, and the
+        workers would wait on it forever.
+        """
+        return self.engine == 'pandas' and self.workers > 1 and num_rows >= PARALLEL_MIN_ROWS
+    
+    def _transform_steps(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Steps 2-5 of the pandas engine. They are row-independent, so frames
+        (or streamed chunks) of at least PARALLEL_MIN_ROWS rows run them in parallel.
+        """
+        if self.forks_workers(len(df)):
+            return self._transform_parallel(df)
+        return self._clean_and_enrich(df)
+    
+    def _transform_parallel(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run steps 2-5 over row ranges in a pool of forked processes.
+        
+        Workers inherit the frame copy-on-write through fork, so only the
+        row bounds are sent to them and only the results are pickled back.
+        Falls back to a single pass where fork is unavailable.
+        
+        Args:
+            df: Deduplicated transaction DataFrame
+            
+        Returns:
+            Concatenated results, in the original row order
+        """
+        global _fork_source
+        
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return self._clean_and_enrich(df)
+        
+        edges = np.linspace(0, len(df), self.workers + 1, dtype=np.int64)
+        bounds = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+        logger.info(f"Transforming {len(df)} transactions in {len(bounds)} processes")
+        
+        _fork_source = (self, df)
+        try:
+            with multiprocessing.get_context('fork').Pool(len(bounds), initializer=_init_worker) as pool:
+                results = pool.map(_transform_rows, bounds)
+        finally:
+            _fork_source = None
+        
+        return pd.concat(results, ignore_index=True)
+    
+    def _transform_polars(self, df: Union[pd.DataFrame, pa.Table]) -> pd.DataFrame:
+        """
+        Run steps 1-5 as one Polars lazy query.
+        
+        The query optimizer fuses the filters and derived columns into a single
+        multi-threaded pass over the Arrow buffers instead of materializing a
+        new DataFrame per step; pandas is only produced at the end.
+        
+        Args:
+            df: Raw transaction DataFrame or Arrow table
+            
+        Returns:
+            Transformed DataFrame, same columns as the pandas engine
+        """
+        import polars as pl
+        
+        frame = pl.from_arrow(df) if isinstance(df, pa.Table) else pl.from_pandas(df)
+        
+        # Raw dates may arrive as strings (e.g. from CSV); anything unparseable becomes null
+        transaction_date = pl.col('transaction_date')
+        if frame.schema['transaction_date'] == pl.Utf8:
+            transaction_date = transaction_date.str.to_datetime(strict=False)
+        
+        now = self._now()
+        two_years_ago = now - MAX_TRANSACTION_AGE
+        upper_fields = ['transaction_id', 'customer_id', 'merchant_id']
+        lower_fields = ['status', 'category', 'payment_method']
+        
+        risk_score = (
+            pl.when(pl.col('amount') > 5000).then(30).otherwise(0)
+            + pl.when(pl.col('amount') > 10000).then(40).otherwise(0)
+            + pl.when(pl.col('status') == 'failed').then(50).otherwise(0)
+            + pl.when(pl.col('transaction_dayofweek') >= 5).then(10).otherwise(0)
+            + pl.when(pl.col('transaction_hour') < 6).then(20).otherwise(0)
+        ).cast(pl.Float32)
+        
+        result = (
+            frame.lazy()
+            # Steps 1-2: dedupe, drop rows missing critical fields, fill the rest
+            .unique(subset=['transaction_id'], keep='first', maintain_order=True)
+            .drop_nulls(['transaction_id', 'customer_id', 'amount'])
+            .with_columns(
+                pl.col('category').cast(pl.Utf8).fill_null('unknown'),
+                pl.col('merchant_id').cast(pl.Utf8).fill_null('MERCH0000')
+            )
+            # Step 3: types and string standardization
+            .with_columns(
+                transaction_date.cast(pl.Datetime('us')),
+                pl.col('amount').cast(pl.Float64, strict=False),
+                *[pl.col(c).cast(pl.Utf8).str.strip_chars().str.to_uppercase() for c in upper_fields],
+                *[pl.col(c).cast(pl.Utf8).str.strip_chars().str.to_lowercase() for c in lower_fields]
+            )
+            # Step 4: business rules as one predicate
+            .filter(
+                pl.col('transaction_date').is_not_null()
+                & pl.col('amount').is_not_null()
+                & (pl.col('amount') > 0)
+                & (pl.col('amount') <= 1_000_000)
+                & pl.col('status').is_in(VALID_STATUSES)
+                & pl.col('transaction_date').is_between(two_years_ago, now)
+            )
+            # Step 5: derived fields (Polars weekdays run 1-7, pandas 0-6)
+            .with_columns(
+                transaction_year=pl.col('transaction_date').dt.year().cast(pl.Int16),
+                transaction_month=pl.col('transaction_date').dt.month().cast(pl.Int8),
+                transaction_day=pl.col('transaction_date').dt.day().cast(pl.Int8),
+                transaction_dayofweek=(pl.col('transaction_date').dt.weekday() - 1).cast(pl.Int8),
+                transaction_hour=pl.col('transaction_date').dt.hour().cast(pl.Int8),
+                amount_category=pl.col('amount').cut(AMOUNT_BINS.tolist(), labels=AMOUNT_LABELS)
+            )
+            .with_columns(risk_score=risk_score)
+            .with_columns(
+                risk_level=pl.col('risk_score').cut(RISK_BINS.tolist(), labels=RISK_LABELS),
+                processed_at=pl.lit(now)
+            )
+            .collect()
+        )
+        
+        removed = frame.height - result.height
+        if removed > 0:
+            logger.warning(f"Removed {removed} transactions that failed cleaning or business rules")
+        
+        return result.to_pandas()
     
     def _remove_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Remove duplicate transaction IDs.
         Keep the first occurrence.
+        
+        A categorical transaction_id (as extracted) is deduplicated on its
+        integer codes without hashing the ID strings.
         """
         initial_count = len(df)
-        df = df.drop_duplicates(subset=['transaction_id'], keep='first')
+        df = df.drop_duplicates(subset=['transaction_id'], keep='first', ignore_index=True)
         duplicates_removed = initial_count - len(df)
         
         if duplicates_removed > 0:
@@ -101,47 +783,87 @@ class DataTransformer:
         - Category: Fill with 'unknown'
         - Merchant: Fill with 'UNKNOWN'
         """
-        initial_count = len(df)
-        
         # Remove records with missing critical fields
+        df = df.iloc[np.flatnonzero(self._missing_value_mask(df))]
+        
+        return self._fill_missing_values(df)
+    
+    def _missing_value_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Flag the records that have every critical field.
+        
+        Returns:
+            Boolean mask of the rows to keep
+        """
         critical_fields = ['transaction_id', 'customer_id', 'amount']
-        for field in critical_fields:
-            before = len(df)
-            df = df[df[field].notna()]
-            removed = before - len(df)
-            if removed > 0:
-                logger.warning(f"Removed {removed} records with missing {field}")
         
-        # Fill non-critical missing values
-        df['category'] = df['category'].fillna('unknown')
-        df['merchant_id'] = df['merchant_id'].fillna('MERCH0000')
+        # Attribute each dropped record to its first missing field, as the
+        # per-field filters did, from one null matrix
+        missing = df[critical_fields].isna().to_numpy()
+        dropped = missing.any(axis=1)
+        removed = np.bincount(missing[dropped].argmax(axis=1), minlength=len(critical_fields))
+        for field, count in zip(critical_fields, removed):
+            if count > 0:
+                logger.warning(f"Removed {count} records with missing {field}")
         
-        return df
+        return ~dropped
+    
+    def _fill_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fill non-critical missing values.
+        """
+        # New frame sharing the other columns, so row slices are never written to
+        return _with_columns(df, {
+            'category': _fill_missing(df['category'], 'unknown'),
+            'merchant_id': _fill_missing(df['merchant_id'], 'MERCH0000'),
+        })
     
     def _validate_data_types(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Ensure correct data types and fix formatting.
         """
+        df, converted = self._convert_types(df)
+        
+        # Remove any records where conversion failed
+        df = df.iloc[np.flatnonzero(converted)]
+        
+        return self._standardize_fields(df)
+    
+    def _convert_types(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Convert transaction_date and amount, coercing bad values to null.
+        
+        Returns:
+            Tuple of the converted frame and a boolean mask of the rows whose
+            conversion succeeded
+        """
+        columns = {}
+        
         # Convert transaction_date to datetime
         if df['transaction_date'].dtype != 'datetime64[ns]':
-            df['transaction_date'] = pd.to_datetime(df['transaction_date'], errors='coerce')
+            columns['transaction_date'] = pd.to_datetime(df['transaction_date'], errors='coerce')
         
         # Ensure amount is numeric
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
+        columns['amount'] = pd.to_numeric(df['amount'], errors='coerce')
         
-        # Remove any records where conversion failed
-        df = df[df['transaction_date'].notna()]
-        df = df[df['amount'].notna()]
+        df = _with_columns(df, columns)
+        converted = df['transaction_date'].notna().to_numpy() & df['amount'].notna().to_numpy()
         
+        return df, converted
+    
+    def _standardize_fields(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Standardize the ID and code fields.
+        """
         # Standardize string fields
-        df['transaction_id'] = df['transaction_id'].astype(str).str.strip().str.upper()
-        df['customer_id'] = df['customer_id'].astype(str).str.strip().str.upper()
-        df['merchant_id'] = df['merchant_id'].astype(str).str.strip().str.upper()
-        df['status'] = df['status'].astype(str).str.strip().str.lower()
-        df['category'] = df['category'].astype(str).str.strip().str.lower()
-        df['payment_method'] = df['payment_method'].astype(str).str.strip().str.lower()
-        
-        return df
+        return _with_columns(df, {
+            'transaction_id': _normalize_strings(df['transaction_id'], upper=True),
+            'customer_id': _normalize_strings(df['customer_id'], upper=True),
+            'merchant_id': _normalize_strings(df['merchant_id'], upper=True),
+            'status': _normalize_categorical(df['status'], upper=False),
+            'category': _normalize_categorical(df['category'], upper=False),
+            'payment_method': _normalize_categorical(df['payment_method'], upper=False),
+        })
     
     def _apply_business_rules(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -154,106 +876,103 @@ class DataTransformer:
         4. Transaction date cannot be in future
         5. Transaction date cannot be older than 2 years
         """
-        initial_count = len(df)
-        
-        # Rule 1: Amount must be positive
-        df = df[df['amount'] > 0]
-        logger.info(f"Filtered negative amounts. Records removed: {initial_count - len(df)}")
+        return df[self._business_rule_mask(_hot_columns(df))]
+    
+    def _business_rule_mask(self, hot: Dict[str, np.ndarray],
+                            alive: np.ndarray = None) -> np.ndarray:
+        """
+        Evaluate the business rules over the hot arrays.
         
-        # Rule 2: Amount must be reasonable (<= $1M)
-        initial_count = len(df)
-        df = df[df['amount'] <= 1_000_000]
-        if initial_count - len(df) > 0:
-            logger.warning(f"Removed {initial_count - len(df)} transactions with amount > $1M")
+        Args:
+            hot: Arrays from _hot_columns
+            alive: Rows still kept by earlier steps (default all); removals
+                   are only counted against these
+            
+        Returns:
+            Boolean mask of the rows that pass all rules
+        """
+        amount = hot['amount']
+        timestamp = hot['timestamp']
+        now = self._now()
+        two_years_ago = np.datetime64(now - MAX_TRANSACTION_AGE, 'us').astype(np.int64)
+        now = np.datetime64(now, 'us').astype(np.int64)
         
-        # Rule 3: Status must be valid
-        valid_statuses = ['completed', 'pending', 'failed']
-        initial_count = len(df)
-        df = df[df['status'].isin(valid_statuses)]
-        if initial_count - len(df) > 0:
-            logger.warning(f"Removed {initial_count - len(df)} transactions with invalid status")
+        if alive is None:
+            alive = np.ones(len(amount), dtype=bool)
         
-        # Rule 4: Transaction date not in future
-        initial_count = len(df)
-        df = df[df['transaction_date'] <= datetime.now()]
-        if initial_count - len(df) > 0:
-            logger.warning(f"Removed {initial_count - len(df)} future-dated transactions")
+        # Rule 1: Amount must be positive
+        keep = alive & (amount > 0)
+        logger.info(f"Filtered negative amounts. Records removed: {np.count_nonzero(alive) - np.count_nonzero(keep)}")
         
-        # Rule 5: Transaction date not older than 2 years
-        two_years_ago = datetime.now() - pd.Timedelta(days=730)
-        initial_count = len(df)
-        df = df[df['transaction_date'] >= two_years_ago]
-        if initial_count - len(df) > 0:
-            logger.warning(f"Removed {initial_count - len(df)} transactions older than 2 years")
+        # Rules 2-5, each counted only against rows the earlier rules kept
+        rules = [
+            # Rule 2: Amount must be reasonable (<= $1M)
+            (amount <= 1_000_000, "Removed {} transactions with amount > $1M"),
+            # Rule 3: Status must be valid
+            (hot['valid_status'], "Removed {} transactions with invalid status"),
+            # Rule 4: Transaction date not in future
+            (timestamp <= now, "Removed {} future-dated transactions"),
+            # Rule 5: Transaction date not older than 2 years
+            (timestamp >= two_years_ago, "Removed {} transactions older than 2 years"),
+        ]
+        for passed, message in rules:
+            removed = np.count_nonzero(keep & ~passed)
+            if removed > 0:
+                logger.warning(message.format(removed))
+            keep &= passed
         
-        return df
+        return keep
     
     def _add_derived_fields(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Add calculated fields for analysis.
         """
-        # Extract date components
-        df['transaction_year'] = df['transaction_date'].dt.year
-        df['transaction_month'] = df['transaction_date'].dt.month
-        df['transaction_day'] = df['transaction_date'].dt.day
-        df['transaction_dayofweek'] = df['transaction_date'].dt.dayofweek
-        df['transaction_hour'] = df['transaction_date'].dt.hour
+        return _with_columns(df, self._derived_columns(_hot_columns(df)))
+    
+    def _derived_columns(self, hot: Dict[str, np.ndarray]) -> Dict[str, object]:
+        """
+        Calculated fields from the hot arrays, in output column order.
+        """
+        # Extract date components, in the narrowest integer type that holds them
+        columns = _date_parts(hot['timestamp'])
         
         # Add amount categories
-        df['amount_category'] = pd.cut(
-            df['amount'],
-            bins=[0, 50, 200, 500, 1000, float('inf')],
-            labels=['small', 'medium', 'large', 'very_large', 'exceptional']
-        )
+        columns['amount_category'] = _fast_cut(hot['amount'], AMOUNT_BINS, AMOUNT_LABELS)
         
         # Add risk score (simple example)
-        df['risk_score'] = 0.0
-        
-        # High amount = higher risk
-        df.loc[df['amount'] > 5000, 'risk_score'] += 30
-        df.loc[df['amount'] > 10000, 'risk_score'] += 40
-        
-        # Failed status = higher risk
-        df.loc[df['status'] == 'failed', 'risk_score'] += 50
-        
-        # Weekend transactions = slightly higher risk
-        df.loc[df['transaction_dayofweek'].isin([5, 6]), 'risk_score'] += 10
-        
-        # Late night transactions = higher risk
-        df.loc[df['transaction_hour'].isin(range(0, 6)), 'risk_score'] += 20
+        risk_score = _risk_scores(
+            hot['amount'],
+            hot['failed'],
+            columns['transaction_dayofweek'],
+            columns['transaction_hour']
+        )
+        columns['risk_score'] = risk_score
         
         # Add risk level
-        df['risk_level'] = pd.cut(
-            df['risk_score'],
-            bins=[-1, 20, 50, 80, 100],
-            labels=['low', 'medium', 'high', 'critical']
-        )
+        columns['risk_level'] = _fast_cut(risk_score, RISK_BINS, RISK_LABELS)
         
         # Add processing timestamp
-        df['processed_at'] = datetime.now()
+        columns['processed_at'] = np.full(len(risk_score), np.datetime64(self._now(), 'us'))
         
-        return df
+        return columns
     
-    def _final_validation(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _final_validation(self, df: Union[pd.DataFrame, pa.Table]) -> Union[pd.DataFrame, pa.Table]:
         """
         Final validation before loading.
         Ensure all required fields are present and valid.
         """
-        required_fields = [
-            'transaction_id', 'customer_id', 'transaction_date',
-            'amount', 'merchant_id', 'category', 'status',
-            'payment_method', 'risk_score', 'risk_level'
-        ]
+        columns = df.column_names if isinstance(df, pa.Table) else df.columns
         
         # Check all required fields exist
-        missing_fields = [f for f in required_fields if f not in df.columns]
+        missing_fields = [f for f in REQUIRED_FIELDS if f not in columns]
         if missing_fields:
             raise ValueError(f"Missing required fields: {missing_fields}")
         
         # Final check: no nulls in critical fields
-        critical_nulls = df[required_fields].isnull().sum()
-        if critical_nulls.sum() > 0:
-            logger.error(f"Critical nulls found: {critical_nulls[critical_nulls > 0]}")
+        required = df.select(REQUIRED_FIELDS) if isinstance(df, pa.Table) else df[REQUIRED_FIELDS]
+        critical_nulls = {f: n for f, n in _null_counts(required).items() if n > 0}
+        if critical_nulls:
+            logger.error(f"Critical nulls found: {critical_nulls}")
             raise ValueError("Critical fields contain null values")
         
         logger.info("Final validation passed ✓")
@@ -267,31 +986,38 @@ class DataTransformer:
     
     def validate_against_customers(
         self, 
-        transactions: pd.DataFrame, 
+        transactions: Union[pd.DataFrame, pa.Table], 
         customers: pd.DataFrame
-    ) -> pd.DataFrame:
+    ) -> Union[pd.DataFrame, pa.Table]:
         """
         Validate transactions against customer data.
         Remove transactions for non-existent customers.
         
         Args:
-            transactions: Transaction DataFrame
+            transactions: Transaction DataFrame, or Arrow table from
+                          transform_transactions_arrow
             customers: Customer DataFrame
             
         Returns:
-            Validated transactions
+            Validated transactions, in the same form as given
         """
         logger.info("Validating transactions against customer data...")
         
         initial_count = len(transactions)
         
-        # Get valid customer IDs
-        valid_customers = set(customers['customer_id'].unique())
-        
-        # Filter transactions
-        transactions = transactions[
-            transactions['customer_id'].isin(valid_customers)
-        ]
+        if isinstance(transactions, pa.Table):
+            customer_ids = transactions['customer_id']
+            valid_customers = pa.array(customers['customer_id'].unique(), type=customer_ids.type)
+            transactions = transactions.filter(pc.is_in(customer_ids, value_set=valid_customers))
+        else:
+            # Valid customer IDs, in the transactions' key dtype so the join
+            # factorizes both sides together and keeps that dtype
+            valid_customers = customers[['customer_id']].drop_duplicates().astype(
+                {'customer_id': transactions['customer_id'].dtype}
+            )
+            
+            # Inner hash join keeps only known customers, in transaction order
+            transactions = transactions.merge(valid_customers, on='customer_id', how='inner')
         
         removed = initial_count - len(transactions)
         if removed > 0:
@@ -314,9 +1040,9 @@ class DataQualityChecker:
         }
         self.quality_issues = []
     
-    def run_quality_checks(self, df: pd.DataFrame, dataset_name: str = "dataset") -> bool:
+    def run_quality_checks(self, df: Union[pd.DataFrame, pa.Table], dataset_name: str = "dataset") -> bool:
         """
-        Run comprehensive quality checks on dataset.
+        Run comprehensive quality checks on dataset (a DataFrame or Arrow table).
         
         Returns:
             True if all checks pass, False otherwise
@@ -360,7 +1086,11 @@ class DataQualityChecker:
     
     def _check_null_percentage(self, df: pd.DataFrame, dataset_name: str) -> bool:
         """Check null value percentage"""
-        null_pct = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+        null_counts = _null_counts(df)
+        if len(df) == 0 or not null_counts:
+            # An empty chunk has no nulls to measure; the row count check reports it
+            return True
+        null_pct = (sum(null_counts.values()) / (len(df) * len(null_counts))) * 100
         
         if null_pct > self.thresholds['max_null_percentage'] * 100:
             issue = f"{dataset_name}: Null percentage {null_pct:.2f}% exceeds threshold {self.thresholds['max_null_percentage']*100}%"
@@ -371,8 +1101,17 @@ class DataQualityChecker:
     
     def _check_duplicates(self, df: pd.DataFrame, dataset_name: str) -> bool:
         """Check duplicate percentage"""
-        if 'transaction_id' in df.columns:
-            dup_pct = (df['transaction_id'].duplicated().sum() / len(df)) * 100
+        columns = df.column_names if isinstance(df, pa.Table) else df.columns
+        if 'transaction_id' in columns:
+            # Rows beyond the first per distinct ID, from a single hash pass
+            n = len(df)
+            if n == 0:
+                return True
+            if isinstance(df, pa.Table):
+                distinct = pc.count_distinct(df['transaction_id'], mode='all').as_py()
+            else:
+                distinct = df['transaction_id'].nunique(dropna=False)
+            dup_pct = (n - distinct) / n * 100
             
             if dup_pct > self.thresholds['max_duplicate_percentage'] * 100:
                 issue = f"{dataset_name}: Duplicate percentage {dup_pct:.2f}% exceeds threshold"
@@ -0,0 +1,161 @@
+"""
+Unit tests for the Lambda transaction processor
+Tests deduplication, filtering and the processed_at column
+"""
+
+import importlib.util
+import io
+import shutil
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+from datetime import datetime
+from pathlib import Path
+
+pytest.importorskip('boto3')
+pytest.importorskip('polars')
+
+LAMBDA_PATH = Path(__file__).parent.parent / 'aws' / 'lambda' / 'transaction_processor.py'
+
+
+@pytest.fixture(scope="module")
+def processor():
+    """Load the Lambda module from its file ('lambda' can't be imported as a package)"""
+    spec = importlib.util.spec_from_file_location('transaction_processor', LAMBDA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _LocalS3:
+    """The few S3 client calls the handler makes, backed by a local directory"""
+    
+    def __init__(self, root):
+        self.root = root
+        self.deleted = []
+    
+    def get_object(self, Bucket, Key, Range):
+        start, end = map(int, Range.split('=')[1].split('-'))
+        data = (self.root / Bucket / Key).read_bytes()[start:end + 1]
+        return {'Body': io.BytesIO(data)}
+    
+    def copy(self, CopySource, Bucket, Key):
+        target = self.root / Bucket / Key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.root / CopySource['Bucket'] / CopySource['Key'], target)
+    
+    def delete_object(self, Bucket, Key):
+        (self.root / Bucket / Key).unlink()
+        self.deleted.append(Key)
+
+
+def _batch(ids, amounts):
+    return pa.table({
+        'transaction_id': pa.array(ids, type=pa.string()),
+        'amount': pa.array(amounts, type=pa.float64()),
+    })
+
+
+class TestProcessTransactions:
+    """Test suite for process_transactions"""
+    
+    def test_keeps_first_occurrence_within_batch(self, processor):
+        """Test that duplicate IDs in a batch keep their first row, in input order"""
+        result = processor.process_transactions(
+            _batch(['TXN2', 'TXN1', 'TXN2', 'TXN3'], [10.0, 20.0, 30.0, 40.0])
+        )
+        
+        assert result['transaction_id'].to_pylist() == ['TXN2', 'TXN1', 'TXN3']
+        assert result['amount'].to_pylist() == [10.0, 20.0, 40.0]
+    
+    def test_drops_ids_seen_in_earlier_batches(self, processor):
+        """Test that seen_ids carries deduplication across batches"""
+        seen_ids = set()
+        first = processor.process_transactions(_batch(['TXN1', 'TXN2'], [10.0, 20.0]), seen_ids=seen_ids)
+        second = processor.process_transactions(_batch(['TXN2', 'TXN3'], [30.0, 40.0]), seen_ids=seen_ids)
+        
+        assert first['transaction_id'].to_pylist() == ['TXN1', 'TXN2']
+        assert second['transaction_id'].to_pylist() == ['TXN3']
+        assert first.schema == second.schema
+        assert seen_ids == {'TXN1', 'TXN2', 'TXN3'}
+    
+    def test_filters_null_and_non_positive_amounts(self, processor):
+        """Test that only rows with a positive amount are kept"""
+        result = processor.process_transactions(
+            _batch(['TXN1', 'TXN2', 'TXN3', 'TXN4'], [10.0, None, 0.0, -5.0])
+        )
+        
+        assert result['transaction_id'].to_pylist() == ['TXN1']
+    
+    def test_processed_at_reads_back_as_timestamp(self, processor):
+        """Test that the dictionary-encoded processed_at decodes to timestamp[us]"""
+        processed_at = datetime(2024, 1, 15, 14, 30)
+        result = processor.process_transactions(
+            _batch(['TXN1', 'TXN2'], [10.0, 20.0]), processed_at=processed_at
+        )
+        
+        column = result['processed_at']
+        assert pa.types.is_dictionary(column.type)
+        decoded = column.cast(column.type.value_type)
+        assert decoded.type == pa.timestamp('us')
+        assert decoded.to_pylist() == [processed_at, processed_at]
+
+
+
+class TestLambdaHandler:
+    """Test suite for lambda_handler's output handling"""
+    
+    @pytest.fixture
+    def bucket(self, processor, tmp_path, monkeypatch):
+        """A local 'bucket' holding a raw CSV, read in small blocks so it spans several"""
+        rows = ''.join(f'TXN{i:03d},{i + 1}.5\n' for i in range(50))
+        raw = tmp_path / 'bucket' / 'raw' / 'transactions.csv'
+        raw.parent.mkdir(parents=True)
+        raw.write_text('transaction_id,amount\n' + rows)
+        (tmp_path / 'bucket' / 'staging' / 'processed').mkdir(parents=True)
+        
+        monkeypatch.setattr(processor, 's3_client', _LocalS3(tmp_path))
+        monkeypatch.setattr(processor, '_get_s3_fs', lambda: fs.SubTreeFileSystem(str(tmp_path), fs.LocalFileSystem()))
+        monkeypatch.setattr(processor, 'RANGE_BYTES', 256)
+        return tmp_path / 'bucket'
+    
+    def _event(self, bucket):
+        raw = bucket / 'raw' / 'transactions.csv'
+        return {'Records': [{'s3': {
+            'bucket': {'name': bucket.name},
+            'object': {'key': 'raw/transactions.csv', 'size': raw.stat().st_size},
+        }}]}
+    
+    def test_publishes_complete_output(self, processor, bucket):
+        """Test that the Parquet file appears under processed/ only once fully written"""
+        response = processor.lambda_handler(self._event(bucket), None)
+        
+        assert response['statusCode'] == 200
+        output = pq.read_table(bucket / 'processed' / 'transactions.parquet')
+        assert output.num_rows == 50
+        assert list((bucket / 'staging' / 'processed').iterdir()) == []
+    
+    def test_failure_leaves_no_partial_output(self, processor, bucket, monkeypatch):
+        """Test that a failure after the first block leaves no Parquet object behind"""
+        process_transactions = processor.process_transactions
+        calls = []
+        
+        def fail_after_first_block(table, **kwargs):
+            calls.append(table.num_rows)
+            if len(calls) > 1:
+                raise RuntimeError("processing failed")
+            return process_transactions(table, **kwargs)
+        
+        monkeypatch.setattr(processor, 'process_transactions', fail_after_first_block)
+        
+        response = processor.lambda_handler(self._event(bucket), None)
+        
+        assert response['statusCode'] == 500
+        assert processor.s3_client.deleted == ['staging/processed/transactions.parquet']
+        assert not (bucket / 'processed').exists()
+        assert list((bucket / 'staging' / 'processed').iterdir()) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,327 @@
+"""
+Unit tests for data loading
+Tests the loader's statements and load paths without a database
+"""
+
+import asyncio
+import pytest
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy.dialects import postgresql
+from src.config import DB_CONFIG
+from src.load import (
+    DataLoader, NullLoader, CUSTOMER_COLUMNS, LOAD_STAGE_PREFIX, SESSION_OPTIONS, TRANSACTION_COLUMNS,
+    _column_arrays, _prepare_transactions
+)
+
+
+class _FakeCopy:
+    """COPY context that counts rows, failing for the connection's failing tables"""
+    
+    def __init__(self, cursor, sql):
+        self.cursor = cursor
+        self.table = sql.split()[1]
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    def set_types(self, types):
+        pass
+    
+    async def write_row(self, row):
+        if self.table in self.cursor.conn.fail_tables:
+            raise RuntimeError(f"COPY into {self.table} failed")
+        self.cursor.rowcount += 1
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    def copy(self, sql):
+        self.conn.statements.append(sql)
+        return _FakeCopy(self, sql)
+
+
+class _FakeAsyncConnection:
+    """Records statements and whether the connection committed or rolled back"""
+    
+    connections = []
+    fail_tables = set()
+    
+    def __init__(self, conninfo):
+        self.conninfo = conninfo
+        self.statements = []
+        self.outcome = None
+    
+    @classmethod
+    async def connect(cls, conninfo):
+        conn = cls(conninfo)
+        cls.connections.append(conn)
+        return conn
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, *exc):
+        self.outcome = 'rollback' if exc_type else 'commit'
+        return False
+    
+    def cursor(self):
+        return _FakeCursor(self)
+    
+    async def execute(self, sql):
+        self.statements.append(sql)
+        cursor = _FakeCursor(self)
+        cursor.rowcount = 1
+        return cursor
+
+
+class _RecordingCursor:
+    def __init__(self, executed):
+        self.executed = executed
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+
+
+class _RecordingConnection:
+    """Stands in for a SQLAlchemy connection (and its driver connection), recording executed statements"""
+    
+    def __init__(self):
+        self.executed = []
+        self.connection = self
+        self.rowcount = 0
+    
+    def cursor(self):
+        return _RecordingCursor(self.executed)
+    
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        self.rowcount = len(params) if isinstance(params, list) else 0
+        return self
+
+
+class TestDataLoader:
+    """Test suite for DataLoader class"""
+    
+    @pytest.fixture
+    def loader(self):
+        """Create loader instance (the engine connects lazily, so no database is needed)"""
+        loader = DataLoader(DB_CONFIG)
+        yield loader
+        loader.engine.dispose()
+    
+    @pytest.fixture
+    def fake_connections(self, monkeypatch):
+        """Replace psycopg's AsyncConnection with a recording fake"""
+        monkeypatch.setattr('src.load.AsyncConnection', _FakeAsyncConnection)
+        monkeypatch.setattr(_FakeAsyncConnection, 'connections', [])
+        monkeypatch.setattr(_FakeAsyncConnection, 'fail_tables', set())
+        return _FakeAsyncConnection
+    
+    @pytest.fixture
+    def frames(self):
+        """One customer and one of their transactions"""
+        return {
+            'dim_customers': pd.DataFrame({
+                'customer_id': ['CUST001'],
+                'customer_name': ['Customer 1'],
+                'registration_date': [datetime(2024, 1, 1)],
+            }),
+            'fact_transactions': pd.DataFrame({
+                'transaction_id': ['TXN001'],
+                'customer_id': ['CUST001'],
+                'amount': [100.5],
+            }),
+        }
+    
+    def test_prepared_transactions_copy_as_plain_values(self):
+        """Test that transaction columns reach COPY as plain Python values, floats for amounts"""
+        transactions = pd.DataFrame({
+            'transaction_id': ['TXN001', 'TXN002'],
+            'transaction_date': [datetime(2024, 1, 15, 14, 30), None],
+            'amount': [100.5, np.nan],
+            'amount_category': pd.Categorical(['large', 'small']),
+            'risk_score': np.array([0, 20], dtype=np.float32),
+        })
+        
+        columns, arrays = _column_arrays(_prepare_transactions(transactions), TRANSACTION_COLUMNS)
+        values = dict(zip(columns, arrays))
+        
+        assert columns['amount'] == columns['risk_score'] == 'float8'
+        assert list(values['amount']) == [100.5, None]
+        assert all(type(v) is float for v in values['risk_score'])
+        assert not any(isinstance(v, Decimal) for v in values['amount'])
+        assert list(values['amount_category']) == ['large', 'small']
+        assert values['transaction_date'][0] == datetime(2024, 1, 15, 14, 30)
+        assert values['transaction_date'][1] is None
+    
+    def test_flush_audit_batches_only_this_loaders_updates(self, loader):
+        """Test that deferred audit updates stay per loader and flush as one UPDATE ... FROM (VALUES ...)"""
+        other = DataLoader(DB_CONFIG)
+        conn = _RecordingConnection()
+        try:
+            for run_id in (7, 8):
+                loader.run_id = run_id
+                loader.update_audit_log('success', records_loaded=run_id, deferred=True)
+            
+            assert other.flush_audit(conn=conn) == 0
+            assert loader.flush_audit(conn=conn) == 2
+            assert loader.flush_audit(conn=conn) == 0
+        finally:
+            other.engine.dispose()
+        
+        [(statement, params)] = conn.executed
+        compiled = statement.compile(dialect=postgresql.psycopg.dialect())
+        sql = ' '.join(compiled.string.split())
+        
+        assert sql.startswith('UPDATE etl_audit_log SET end_time = CAST(v.end_time AS timestamp)')
+        assert 'quality_report = CAST(v.quality_report AS jsonb)' in sql
+        assert 'FROM (VALUES (%(run_id_0)s, ' in sql
+        assert ', (%(run_id_1)s, ' in sql
+        assert 'WHERE etl_audit_log.run_id = CAST(v.run_id AS integer)' in sql
+        assert set(compiled.params) == set(params) == {
+            f'{field}_{i}' for i in range(2) for field in [
+                'run_id', 'end_time', 'status', 'records_extracted', 'records_transformed',
+                'records_loaded', 'records_rejected', 'error_message', 'quality_report'
+            ]
+        }
+        assert (params['run_id_0'], params['records_loaded_0']) == (7, 7)
+        assert (params['run_id_1'], params['records_loaded_1']) == (8, 8)
+    
+    def test_parquet_load_quotes_the_server_path(self, loader, tmp_path):
+        """Test that a path with quotes or % reaches COPY as one quoted literal"""
+        path = tmp_path / "it's 100%" / 'transactions.parquet'
+        path.parent.mkdir()
+        pq.write_table(pa.table({'transaction_id': ['TXN001'], 'amount': [100.5]}), path)
+        conn = _RecordingConnection()
+        
+        loader.load_transactions_from_parquet(path, conn=conn)
+        
+        (copy, params), *merge = conn.executed
+        assert params is None
+        literal = "'" + str(path).replace("'", "''") + "'"
+        assert copy == (
+            f'COPY stg_fact_transactions ("transaction_id", "amount") FROM {literal} '
+            "WITH (format 'parquet')"
+        )
+        assert len(merge) == 2
+    
+    def test_copy_falls_back_to_chunked_inserts(self, loader, frames, monkeypatch):
+        """Test that drivers without COPY load through executemany INSERTs, one chunk at a time"""
+        monkeypatch.setattr(loader.engine.dialect, 'driver', 'psycopg2')
+        customers = pd.concat([frames['dim_customers']] * 3, ignore_index=True)
+        conn = _RecordingConnection()
+        
+        assert loader._copy_df(customers, 'dim_customers', CUSTOMER_COLUMNS, conn=conn) == 3
+        [(statement, params)] = conn.executed
+        assert str(statement).startswith('INSERT INTO dim_customers (customer_id, customer_name, registration_date)')
+        assert params[0] == {
+            'customer_id': 'CUST001', 'customer_name': 'Customer 1', 'registration_date': datetime(2024, 1, 1)
+        }
+        
+        columns, arrays = _column_arrays(customers, CUSTOMER_COLUMNS)
+        assert loader._insert_rows('dim_customers', columns, zip(*arrays), conn=conn, chunksize=2) == 3
+        assert [len(params) for _, params in conn.executed[1:]] == [2, 1]
+    
+    def test_driver_comes_from_db_config(self):
+        """Test that the SQLAlchemy driver can be configured"""
+        pytest.importorskip('psycopg2')
+        loader = DataLoader({**DB_CONFIG, 'driver': 'psycopg2'})
+        try:
+            assert loader.engine.dialect.driver == 'psycopg2'
+        finally:
+            loader.engine.dispose()
+    
+    def test_aload_many_merges_with_customers_in_one_transaction(self, loader, fake_connections, frames):
+        """Test that customers and the merge of this load's stage commit together"""
+        counts = asyncio.run(loader.aload_many(frames))
+        
+        assert counts == {'dim_customers': 1, 'fact_transactions': 1}
+        main = next(c for c in fake_connections.connections if 'dim_customers' in c.statements[0])
+        stage = next(c for c in fake_connections.connections if c is not main)
+        stage_table = stage.statements[0].split()[3]
+        assert stage_table.startswith(LOAD_STAGE_PREFIX)
+        assert stage.statements[1].startswith(f'COPY {stage_table} ')
+        assert main.statements[-2:] == [
+            f'INSERT INTO fact_transactions SELECT * FROM {stage_table}',
+            f'DROP TABLE IF EXISTS {stage_table}',
+        ]
+        assert main.outcome == stage.outcome == 'commit'
+        assert all(SESSION_OPTIONS.split()[1] in c.conninfo for c in fake_connections.connections)
+    
+    def test_concurrent_aload_many_stage_separately(self, loader, fake_connections, frames):
+        """Test that overlapping loads never merge or drop each other's stage"""
+        async def load_twice():
+            return await asyncio.gather(loader.aload_many(frames), loader.aload_many(frames))
+        
+        asyncio.run(load_twice())
+        
+        statements = [s for c in fake_connections.connections for s in c.statements]
+        stages = [s.split()[3] for s in statements if s.startswith('CREATE')]
+        merged = [s.split()[-1] for s in statements if s.startswith('INSERT')]
+        assert len(set(stages)) == 2
+        assert sorted(merged) == sorted(stages)
+    
+    def test_aload_many_drops_stage_on_failure(self, loader, fake_connections, frames):
+        """Test that a failed load rolls back customers and leaves no staged rows behind"""
+        fake_connections.fail_tables = {'dim_customers'}
+        
+        with pytest.raises(RuntimeError):
+            asyncio.run(loader.aload_many(frames))
+        
+        main, stage, cleanup = fake_connections.connections
+        assert main.outcome == 'rollback'
+        assert not any(s.startswith('INSERT INTO fact_transactions') for s in main.statements)
+        # The stage and its rows committed on their own, so the stage is dropped afterwards
+        assert stage.outcome == 'commit'
+        assert cleanup.statements == [f'DROP TABLE IF EXISTS {stage.statements[0].split()[3]}']
+        assert cleanup.outcome == 'commit'
+
+
+class TestNullLoader:
+    """Test suite for the dry-run NullLoader"""
+    
+    def test_mirrors_data_loader_surface(self):
+        """Test that every public DataLoader method has a NullLoader counterpart"""
+        public = {name for name in vars(DataLoader) if not name.startswith('_')}
+        
+        assert public <= set(vars(NullLoader))
+        for name in public:
+            assert asyncio.iscoroutinefunction(getattr(DataLoader, name)) == \
+                asyncio.iscoroutinefunction(getattr(NullLoader, name))
+    
+    def test_no_op_results(self):
+        """Test that the no-op methods return empty results of the right shape"""
+        loader = NullLoader()
+        frames = {'dim_customers': pd.DataFrame({'customer_id': ['CUST001', 'CUST002']})}
+        
+        assert asyncio.run(loader.aload_many(frames)) == {'dim_customers': 2}
+        assert loader.flush_audit() == 0
+        assert loader.run_quality_checks('quality_checks.sql') == []
+        assert loader.run_quality_checks('quality_checks.sql', as_dataframe=True).empty
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-v'])
@@ -3,11 +3,13 @@ Integration tests for complete ETL pipeline
 Tests end-to-end data flow
 """
 
+import time
 import pytest
 import pandas as pd
 from src.pipeline import ETLPipeline
 from src.config import DB_CONFIG
 from src.load import DataLoader
+import pyarrow.parquet as pq
 
 
 class TestETLPipeline:
@@ -24,6 +26,85 @@ class TestETLPipeline:
         result = pipeline.run(num_transactions=100, num_customers=50)
         assert result is True
     
+    def test_dry_run_skips_database(self):
+        """Test that a dry run completes without a database connection"""
+        pipeline = ETLPipeline(dry_run=True)
+        
+        result = pipeline.run(num_transactions=100, num_customers=50)
+        assert result is True
+    
+    def test_failed_run_resets_transform_stream(self, monkeypatch):
+        """Test that a run failing mid-stream doesn't leave its IDs behind for the next run"""
+        pipeline = ETLPipeline(dry_run=True)
+        load_transactions = pipeline.loader.load_transactions
+        
+        def fail(*args, **kwargs):
+            raise RuntimeError("load failed")
+        
+        monkeypatch.setattr(pipeline.loader, 'load_transactions', fail)
+        with pytest.raises(RuntimeError):
+            pipeline.run(num_transactions=100, num_customers=50)
+        
+        monkeypatch.setattr(pipeline.loader, 'load_transactions', load_transactions)
+        assert pipeline.run(num_transactions=100, num_customers=50) is True
+        assert pipeline.transformer.get_quality_report()['transactions']['final_records'] > 0
+    
+    def test_forked_transform_waits_for_customers_load(self, monkeypatch):
+        """Test that the transform's worker pool is only forked once the customers load thread is done"""
+        pipeline = ETLPipeline(dry_run=True)
+        pipeline.transformer.workers = 2
+        events = []
+        load_customers = pipeline.loader.load_customers
+        transform_parallel = pipeline.transformer._transform_parallel
+        
+        def slow_load_customers(*args, **kwargs):
+            time.sleep(0.2)
+            events.append('customers loaded')
+            return load_customers(*args, **kwargs)
+        
+        def record_fork(df):
+            events.append('fork')
+            return transform_parallel(df)
+        
+        monkeypatch.setattr(pipeline.transformer, 'forks_workers', lambda num_rows: True)
+        monkeypatch.setattr(pipeline.transformer, '_transform_parallel', record_fork)
+        monkeypatch.setattr(pipeline.loader, 'load_customers', slow_load_customers)
+        
+        assert pipeline.run(num_transactions=100, num_customers=50) is True
+        assert events == ['customers loaded', 'fork']
+    
+    @pytest.fixture
+    def clean_chunk(self, pipeline):
+        """A transformed chunk, as the pipeline loads it"""
+        chunk = pipeline.transformer.transform_chunk(pipeline.extractor.extract_transactions(50))
+        pipeline.transformer.on_complete()
+        return chunk
+    
+    def test_parquet_load_removes_staged_file(self, pipeline, clean_chunk, monkeypatch, tmp_path):
+        """Test that each chunk's Parquet file is deleted once the server has loaded it"""
+        monkeypatch.setattr('src.pipeline.PARQUET_LOAD', True)
+        monkeypatch.setattr('src.pipeline.PROCESSED_DATA_DIR', tmp_path)
+        staged = []
+        
+        def load_from_parquet(path, conn=None):
+            staged.append(path)
+            return pq.read_metadata(path).num_rows
+        
+        monkeypatch.setattr(pipeline.loader, 'load_transactions_from_parquet', load_from_parquet)
+        
+        assert pipeline._load_transactions(clean_chunk, 0, conn=None) == len(clean_chunk)
+        assert len(staged) == 1
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_dry_run_parquet_load_reports_rows(self, clean_chunk, monkeypatch, tmp_path):
+        """Test that a dry run with Parquet loading reports the rows it would have loaded"""
+        monkeypatch.setattr('src.pipeline.PARQUET_LOAD', True)
+        monkeypatch.setattr('src.pipeline.PROCESSED_DATA_DIR', tmp_path)
+        pipeline = ETLPipeline(dry_run=True)
+        
+        assert pipeline._load_transactions(clean_chunk, 0, conn=None) == len(clean_chunk)
+        assert list(tmp_path.iterdir()) == []
+    
     def test_data_loaded_to_database(self):
         """Test that data actually appears in database"""
         loader = DataLoader(DB_CONFIG)
@@ -6,99 +6,117 @@ Tests data cleaning, validation, and quality checks
 import pytest
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+import pyarrow as pa
+from datetime import datetime
 from src.transform import DataTransformer, DataQualityChecker
 
+# Reference time for the sample dates, taken once per test module (local and
+# naive, like the transformer's own clock)
+NOW = pd.Timestamp.now().floor('s')
+
+# Seeded generator for random test data, so every run sees the same values
+RNG = np.random.default_rng(42)
+
+
+def _ids(prefix, n):
+    """IDs like TXN000, TXN001, ... formatted by NumPy instead of a Python loop"""
+    return np.char.add(prefix, np.char.zfill(np.arange(n).astype('U3'), 3))
+
+
+def _business_rule_rows(transaction_dates, amounts):
+    """Two completed transactions with the given dates and amounts"""
+    return pd.DataFrame({
+        'transaction_id': ['TXN001', 'TXN002'],
+        'customer_id': ['CUST001', 'CUST002'],
+        'transaction_date': transaction_dates,
+        'amount': amounts,
+        'status': ['completed', 'completed']
+    })
+
+
+def _negative_amount_rows():
+    """One valid transaction and one with a negative amount"""
+    return _business_rule_rows([NOW, NOW], [100.0, -50.0])
+
+
+def _future_date_rows():
+    """One valid transaction and one dated in the future"""
+    return _business_rule_rows(NOW + pd.to_timedelta(np.array([-1, 1]), unit='D'), [100.0, 150.0])
+
 
 class TestDataTransformer:
     """Test suite for DataTransformer class"""
     
+    # Function-scoped on purpose: the transformer carries run_time, stream and
+    # quality report state between calls, which a shared instance would leak
+    # from test to test
     @pytest.fixture
     def transformer(self):
         """Create transformer instance"""
         return DataTransformer()
     
-    @pytest.fixture
-    def sample_dirty_data(self):
-        """Create sample data with quality issues"""
+    @pytest.fixture(scope="module")
+    def dirty_data_template(self):
+        """Build the sample data with quality issues once per module"""
         return pd.DataFrame({
             'transaction_id': ['TXN001', 'TXN002', 'TXN002', 'TXN003', 'TXN004'],  # Has duplicate
             'customer_id': ['CUST001', 'CUST002', None, 'CUST004', 'CUST005'],     # Has null
-            'transaction_date': [
-                datetime.now() - timedelta(days=1),
-                datetime.now() - timedelta(days=2),
-                datetime.now() - timedelta(days=3),
-                datetime.now() + timedelta(days=1),  # Future date (invalid)
-                datetime.now() - timedelta(days=4)
-            ],
+            # Days from now; the fourth is a future date (invalid)
+            'transaction_date': NOW + pd.to_timedelta(np.array([-1, -2, -3, 1, -4]), unit='D'),
             'amount': [100.50, 250.00, -50.00, 75.25, None],  # Has negative and null
             'merchant_id': ['MERCH001', 'MERCH002', 'MERCH003', 'MERCH004', 'MERCH005'],
-            'category': ['groceries', 'restaurants', None, 'retail', 'utilities'],
-            'status': ['completed', 'completed', 'completed', 'invalid_status', 'pending'],
-            'payment_method': ['credit_card', 'debit_card', 'credit_card', 'cash', 'bank_transfer']
+            # Low-cardinality fields as categoricals, as extract_transactions produces them
+            'category': pd.Categorical(['groceries', 'restaurants', None, 'retail', 'utilities']),
+            'status': pd.Categorical(['completed', 'completed', 'completed', 'invalid_status', 'pending']),
+            'payment_method': pd.Categorical(['credit_card', 'debit_card', 'credit_card', 'cash', 'bank_transfer'])
         })
     
+    @pytest.fixture
+    def sample_dirty_data(self, dirty_data_template):
+        """Create sample data with quality issues (a copy: the transform steps assign columns)"""
+        return dirty_data_template.copy()
+    
     def test_remove_duplicates(self, transformer, sample_dirty_data):
         """Test duplicate removal"""
         result = transformer._remove_duplicates(sample_dirty_data)
         
         # Should remove one duplicate
         assert len(result) == 4
-        assert result['transaction_id'].is_unique
+        assert result['transaction_id'].nunique(dropna=False) == len(result)
     
     def test_handle_missing_values(self, transformer, sample_dirty_data):
         """Test missing value handling"""
         result = transformer._handle_missing_values(sample_dirty_data)
         
         # Should remove records with null critical fields
-        assert result['transaction_id'].notna().all()
-        assert result['customer_id'].notna().all()
-        assert result['amount'].notna().all()
+        assert not pd.isna(result['transaction_id'].to_numpy()).any()
+        assert not pd.isna(result['customer_id'].to_numpy()).any()
+        assert not np.isnan(result['amount'].to_numpy()).any()
     
     def test_validate_data_types(self, transformer, sample_dirty_data):
         """Test data type validation"""
         result = transformer._validate_data_types(sample_dirty_data)
         
-        # Check data types (pandas 3.0 uses 'us' instead of 'ns')
-        assert str(result['transaction_date'].dtype).startswith('datetime64')
-        assert pd.api.types.is_numeric_dtype(result['amount'])
-        # Pandas 3.0 returns StringDtype which shows as 'str'
-        assert result['status'].dtype == 'object' or 'str' in str(result['status'].dtype).lower()
-    
-    def test_apply_business_rules_removes_negative_amounts(self, transformer):
-        """Test that negative amounts are removed"""
-        df = pd.DataFrame({
-            'transaction_id': ['TXN001', 'TXN002'],
-            'customer_id': ['CUST001', 'CUST002'],
-            'transaction_date': [datetime.now(), datetime.now()],
-            'amount': [100.0, -50.0],
-            'status': ['completed', 'completed']
-        })
-        
-        result = transformer._apply_business_rules(df)
-        
-        # Should only have positive amounts
-        assert len(result) == 1
-        assert (result['amount'] > 0).all()
+        # Check data types by dtype kind (any datetime64 unit; pandas 3.0 uses 'us')
+        dtypes = result.dtypes
+        assert dtypes['transaction_date'].kind == 'M'
+        assert dtypes['amount'].kind in 'fi'
+        # Low-cardinality string fields are normalized as categoricals
+        assert isinstance(dtypes['status'], pd.CategoricalDtype)
+        assert result['status'].tolist() == ['completed', 'completed', 'completed', 'invalid_status']
     
-    def test_apply_business_rules_removes_future_dates(self, transformer):
-        """Test that future dates are removed"""
-        df = pd.DataFrame({
-            'transaction_id': ['TXN001', 'TXN002'],
-            'customer_id': ['CUST001', 'CUST002'],
-            'transaction_date': [
-                datetime.now() - timedelta(days=1),
-                datetime.now() + timedelta(days=1)
-            ],
-            'amount': [100.0, 150.0],
-            'status': ['completed', 'completed']
-        })
-        
-        result = transformer._apply_business_rules(df)
+    @pytest.mark.parametrize("build,expected_len,check", [
+        pytest.param(_negative_amount_rows, 1, lambda result: (result['amount'].to_numpy() > 0).all(),
+                     id='negative_amounts'),
+        pytest.param(_future_date_rows, 1, lambda result: (result['transaction_date'] <= NOW).all(),
+                     id='future_dates'),
+    ])
+    def test_apply_business_rules_removes_invalid_rows(self, transformer, build, expected_len, check):
+        """Test that rows breaking a business rule are removed"""
+        result = transformer._apply_business_rules(build())
         
-        # Should only have past/present dates
-        assert len(result) == 1
-        assert (result['transaction_date'] <= datetime.now()).all()
+        assert len(result) == expected_len
+        assert check(result)
     
     def test_add_derived_fields(self, transformer):
         """Test derived field creation"""
@@ -115,19 +133,23 @@ class TestDataTransformer:
         
         result = transformer._add_derived_fields(df)
         
-        # Check derived fields exist
-        assert 'transaction_year' in result.columns
-        assert 'transaction_month' in result.columns
-        assert 'transaction_day' in result.columns
-        assert 'risk_score' in result.columns
-        assert 'risk_level' in result.columns
-        assert 'amount_category' in result.columns
-        
-        # Verify values
-        assert result['transaction_year'].iloc[0] == 2024
-        assert result['transaction_month'].iloc[0] == 1
-        assert result['transaction_day'].iloc[0] == 15
+        # 2024-01-15 was a Monday; a daytime $250 completed payment carries no risk
+        expected = pd.DataFrame({
+            'transaction_year': [2024],
+            'transaction_month': [1],
+            'transaction_day': [15],
+            'transaction_dayofweek': [0],
+            'transaction_hour': [14],
+            'amount_category': ['large'],
+            'risk_score': [0.0],
+            'risk_level': ['low']
+        })
+        pd.testing.assert_frame_equal(
+            result[expected.columns], expected,
+            check_dtype=False, check_categorical=False, check_like=True
+        )
     
+    @pytest.mark.slow
     def test_complete_transformation_pipeline(self, transformer, sample_dirty_data):
         """Test complete transformation pipeline"""
         result = transformer.transform_transactions(sample_dirty_data)
@@ -137,9 +159,9 @@ class TestDataTransformer:
         
         # Should have cleaned data
         assert len(result) > 0
-        assert result['transaction_id'].is_unique
-        assert result['amount'].notna().all()
-        assert (result['amount'] > 0).all()
+        assert result['transaction_id'].nunique(dropna=False) == len(result)
+        assert not np.isnan(result['amount'].to_numpy()).any()
+        assert (result['amount'].to_numpy() > 0).all()
         
         # Should have derived fields
         assert 'risk_score' in result.columns
@@ -150,26 +172,151 @@ class TestDataTransformer:
         assert 'transactions' in report
         assert 'initial_records' in report['transactions']
         assert 'final_records' in report['transactions']
+    
+    def test_polars_engine_matches_pandas(self, sample_dirty_data):
+        """Test that the Polars engine produces the same rows as pandas"""
+        pytest.importorskip('polars')
+        
+        expected = DataTransformer().transform_transactions(sample_dirty_data.copy())
+        result = DataTransformer(engine='polars').transform_transactions(sample_dirty_data.copy())
+        
+        assert list(result.columns) == list(expected.columns)
+        assert result['transaction_id'].tolist() == expected['transaction_id'].tolist()
+        assert result['risk_score'].tolist() == expected['risk_score'].tolist()
+        assert result['amount_category'].astype(str).tolist() == expected['amount_category'].astype(str).tolist()
+    
+    def test_arrow_transform_matches_pandas(self, transformer, sample_dirty_data):
+        """Test that the Arrow pipeline produces the same rows as pandas"""
+        expected = DataTransformer().transform_transactions(sample_dirty_data.copy())
+        result = transformer.transform_transactions_arrow(
+            pa.Table.from_pandas(sample_dirty_data, preserve_index=False)
+        )
+        
+        assert isinstance(result, pa.Table)
+        assert result.column_names == list(expected.columns)
+        assert result['transaction_id'].to_pylist() == expected['transaction_id'].tolist()
+        assert result['risk_score'].to_pylist() == expected['risk_score'].tolist()
+        assert transformer.get_quality_report()['transactions']['final_records'] == len(expected)
+    
+    @pytest.mark.parametrize("engine", ['arrow', 'polars'])
+    def test_engines_drop_unparseable_values_like_pandas(self, engine):
+        """Test that every engine drops rows whose date or amount doesn't parse"""
+        if engine == 'polars':
+            pytest.importorskip('polars')
+        dates = (NOW + pd.to_timedelta(np.arange(-1, -7, -1), unit='D')).strftime('%Y-%m-%d %H:%M:%S')
+        malformed = pd.DataFrame({
+            'transaction_id': _ids('TXN', 6),
+            'customer_id': _ids('CUST', 6),
+            'transaction_date': np.where(np.arange(6) == 1, 'notadate', dates),
+            'amount': ['100.50', '20', 'abc', '30', '40', '50'],
+            'merchant_id': _ids('MERCH', 6),
+            'category': ['groceries'] * 6,
+            'status': ['completed'] * 6,
+            'payment_method': ['cash'] * 6
+        })
+        
+        expected = DataTransformer().transform_transactions(malformed.copy())
+        if engine == 'arrow':
+            result = DataTransformer().transform_transactions_arrow(
+                pa.Table.from_pandas(malformed, preserve_index=False)
+            )['transaction_id'].to_pylist()
+        else:
+            result = DataTransformer(engine='polars').transform_transactions(malformed.copy())
+            result = result['transaction_id'].tolist()
+        
+        assert expected['transaction_id'].tolist() == ['TXN000', 'TXN003', 'TXN004', 'TXN005']
+        assert result == expected['transaction_id'].tolist()
+    
+    def test_transform_chunk_drops_ids_from_earlier_chunks(self, transformer, sample_dirty_data):
+        """Test that streamed chunks are deduplicated across chunk boundaries"""
+        first = transformer.transform_chunk(sample_dirty_data.copy())
+        second = transformer.transform_chunk(sample_dirty_data.copy())
+        report = transformer.on_complete()
+        
+        assert len(first) > 0
+        assert len(second) == 0
+        assert report['initial_records'] == 2 * len(sample_dirty_data)
+        assert report['final_records'] == len(first)
+    
+    def test_transform_chunk_keeps_new_ids_beside_repeats(self, transformer, sample_dirty_data):
+        """Test that only the repeated IDs of a partly overlapping chunk are dropped"""
+        first = transformer.transform_chunk(sample_dirty_data.iloc[:1].copy())
+        second = transformer.transform_chunk(sample_dirty_data.iloc[:2].copy())
+        transformer.on_complete()
+        
+        assert first['transaction_id'].tolist() == ['TXN001']
+        assert second['transaction_id'].tolist() == ['TXN002']
+    
+    def test_parallel_transform_matches_serial(self, sample_dirty_data, monkeypatch):
+        """Test that splitting rows across worker processes changes nothing"""
+        monkeypatch.setattr('src.transform.PARALLEL_MIN_ROWS', 1)
+        
+        expected = DataTransformer(workers=1).transform_transactions(sample_dirty_data.copy())
+        result = DataTransformer(workers=2).transform_transactions(sample_dirty_data.copy())
+        
+        assert result['transaction_id'].tolist() == expected['transaction_id'].tolist()
+        assert result['risk_score'].tolist() == expected['risk_score'].tolist()
+    
+    def test_large_chunks_transform_in_parallel(self, sample_dirty_data, monkeypatch):
+        """Test that streamed chunks of at least PARALLEL_MIN_ROWS use the worker pool"""
+        monkeypatch.setattr('src.transform.PARALLEL_MIN_ROWS', 1)
+        parallel_rows = []
+        transform_parallel = DataTransformer._transform_parallel
+        monkeypatch.setattr(
+            DataTransformer, '_transform_parallel',
+            lambda self, df: parallel_rows.append(len(df)) or transform_parallel(self, df)
+        )
+        
+        expected = DataTransformer(workers=1).transform_chunk(sample_dirty_data.copy())
+        result = DataTransformer(workers=2).transform_chunk(sample_dirty_data.copy())
+        
+        assert parallel_rows == [4]
+        assert result['transaction_id'].tolist() == expected['transaction_id'].tolist()
+        assert result['risk_score'].tolist() == expected['risk_score'].tolist()
+    
+    @pytest.mark.parametrize('kernel', ['_risk_kernel', '_risk_kernel_serial'])
+    def test_risk_kernels_match_numpy_fallback(self, kernel, monkeypatch):
+        """Test that the numba kernels, compiled and as plain Python, score like the NumPy fallback"""
+        pytest.importorskip('numba')
+        import src.transform as transform
+        n = 1000
+        amount = RNG.choice([100.0, 5000.0, 5000.01, 10000.0, 10000.01, 20000.0], n)
+        failed = RNG.random(n) < 0.5
+        dayofweek = RNG.integers(0, 7, n).astype(np.int8)
+        hour = RNG.integers(0, 24, n).astype(np.int8)
+        
+        compiled = getattr(transform, kernel)
+        results = []
+        for rules in (compiled, compiled.py_func):
+            out = np.empty(n, dtype=np.float32)
+            rules(amount, failed, dayofweek, hour, out)
+            results.append(out)
+        monkeypatch.setattr(transform, 'njit', None)
+        expected = transform._risk_scores(amount, failed, dayofweek, hour)
+        
+        for out in results:
+            np.testing.assert_array_equal(out, expected)
 
 
 class TestDataQualityChecker:
     """Test suite for DataQualityChecker class"""
     
+    # Function-scoped, like transformer: quality_issues accumulate across calls
     @pytest.fixture
     def quality_checker(self):
         """Create quality checker instance"""
         return DataQualityChecker()
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def good_data(self):
         """Create clean data that passes all checks"""
         return pd.DataFrame({
-            'transaction_id': [f'TXN{i:03d}' for i in range(200)],
-            'customer_id': [f'CUST{i:03d}' for i in range(200)],
-            'amount': np.random.uniform(10, 1000, 200)
+            'transaction_id': _ids('TXN', 200),
+            'customer_id': _ids('CUST', 200),
+            'amount': RNG.uniform(10, 1000, 200)
         })
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def bad_data_few_rows(self):
         """Create data with too few rows"""
         return pd.DataFrame({
@@ -190,12 +337,21 @@ class TestDataQualityChecker:
         assert result is False
         assert len(quality_checker.quality_issues) > 0
     
+    def test_quality_check_handles_empty_chunk(self, quality_checker, good_data):
+        """Test that a chunk with every row filtered out fails the row count, not with ZeroDivisionError"""
+        result = quality_checker.run_quality_checks(good_data.iloc[:0], "test_dataset")
+        
+        assert result is False
+        assert any('Row count 0' in issue for issue in quality_checker.quality_issues)
+    
     def test_quality_check_detects_high_nulls(self, quality_checker):
         """Test that high null percentage is detected"""
+        customer_ids = np.empty(200, dtype=object)  # 50% nulls
+        customer_ids[100:] = _ids('CUST', 100)
         data_with_nulls = pd.DataFrame({
-            'transaction_id': [f'TXN{i:03d}' for i in range(200)],
-            'customer_id': [None] * 100 + [f'CUST{i:03d}' for i in range(100)],  # 50% nulls
-            'amount': [100.0] * 200
+            'transaction_id': _ids('TXN', 200),
+            'customer_id': customer_ids,
+            'amount': np.full(200, 100.0)
         })
         
         result = quality_checker.run_quality_checks(data_with_nulls, "test_dataset")